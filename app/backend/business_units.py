@@ -0,0 +1,60 @@
+import re
+from typing import NamedTuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+class BusinessUnit(NamedTuple):
+    code: str
+    stripe_key: str
+
+
+# Order numbers start with their business unit's prefix, e.g. CEFE000002485. Codes are
+# the upper-case labels the dashboards and exports show; matching ignores case.
+BUSINESS_UNITS = (
+    BusinessUnit("FE", "STRIPE_SECRET_KEY_PARTSFE"),
+    BusinessUnit("CEFE", "STRIPE_SECRET_KEY_PARTSFE"),
+    BusinessUnit("FEUK", "STRIPE_SECRET_KEY_PARTSFE"),
+    BusinessUnit("HNC", "STRIPE_SECRET_KEY_PARTSHNC"),
+    BusinessUnit("HNK", "STRIPE_SECRET_KEY_HNKPARTS"),
+    BusinessUnit("HT", "STRIPE_SECRET_KEY_HT"),
+    BusinessUnit("WTB", "STRIPE_SECRET_KEY_WTB"),
+)
+CODES = [unit.code for unit in BUSINESS_UNITS]
+OTHER = "OTHER"
+
+_BY_CODE = {unit.code.upper(): unit for unit in BUSINESS_UNITS}
+# Longest prefixes first, and a prefix only counts when no letter follows it, so
+# FEUK1 is FEUK, FE1 is FE and FEX1 is nothing.
+_PREFIX = re.compile(
+    "^(" + "|".join(sorted(map(re.escape, _BY_CODE), key=len, reverse=True)) + ")(?![A-Za-z])",
+    re.IGNORECASE,
+)
+_HEAD_LEN = max(map(len, _BY_CODE)) + 1
+
+
+def match(order_number: str) -> BusinessUnit | None:
+    """Business unit an order number belongs to, matched case-insensitively."""
+    m = _PREFIX.match(order_number or "")
+    return _BY_CODE[m.group(1).upper()] if m else None
+
+
+def code_of(order_number: str) -> str:
+    unit = match(order_number)
+    return unit.code if unit else OTHER
+
+
+def classify(order_numbers: pd.Series) -> pd.Series:
+    """
+    Vectorised ``code_of``, as a categorical over ``CODES + [OTHER]``. Only the first few
+    characters decide the unit, so the matcher runs once per distinct head, not per row.
+    """
+    values = pc.fill_null(pa.array(order_numbers.to_numpy(dtype=object), pa.string(), from_pandas=True), "")
+    heads = pc.utf8_slice_codeunits(values, 0, _HEAD_LEN).dictionary_encode()
+    categories = [*CODES, OTHER]
+    position = {code: i for i, code in enumerate(categories)}
+    head_codes = pa.array([position[code_of(h)] for h in heads.dictionary.to_pylist()], pa.int8())
+    codes = head_codes.take(heads.indices).to_numpy(zero_copy_only=False)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=order_numbers.index)
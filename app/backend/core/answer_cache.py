@@ -0,0 +1,98 @@
+from __future__ import annotations
+import os, re
+from dataclasses import dataclass
+from typing import Any, FrozenSet, Optional
+
+from app.backend.core.freshness import data_version
+from app.backend.core.lru_cache import TTLLRUCache
+
+MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "256"))
+# How long a chat answer is reused before the question is answered again.
+TTL_SECS = float(os.getenv("ANSWER_CACHE_TTL_SECS", "300"))
+# Below 1, a question may reuse an answer whose wording differs only in _STOPWORDS
+# (and whose token-set Jaccard similarity reaches this value). 1 = exact match only.
+SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "1.0"))
+
+_WORD = re.compile(r"[a-z0-9]+")
+_FILLER = frozenset({"a", "an", "the", "please", "me", "show", "tell", "what", "whats", "is", "are", "of", "for"})
+# The only words a fuzzy match may ignore. Everything else -- negations, vendor and
+# provider names, dates, measures -- can change the answer and must match exactly.
+_STOPWORDS = frozenset(
+    "please me show tell give list can could would you i we us our my kindly just hey hi do does how s".split()
+)
+
+
+def normalize_question(question: str) -> str:
+    """Lower-cased words without punctuation or filler, so trivial rewordings share a key."""
+    words = _WORD.findall(question.lower())
+    return " ".join(w for w in words if w not in _FILLER) or " ".join(words)
+
+
+def _tokens(normalized: str) -> FrozenSet[str]:
+    return frozenset(normalized.split())
+
+
+def _similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not (a ^ b) <= _STOPWORDS:
+        return 0.0
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+@dataclass(frozen=True)
+class CachedAnswer:
+    question: str
+    sql: Optional[str]
+    rows: Any
+    answer: str
+    data_version: int
+
+
+class AnswerCache:
+    """Answers to chat questions, keyed on (data version, normalised question)."""
+
+    def __init__(self, maxsize: int = MAX_ENTRIES, ttl_secs: float = TTL_SECS, similarity: float = SIMILARITY):
+        self.similarity = similarity
+        self._cache = TTLLRUCache(maxsize, ttl_secs)
+        self._similar_hits = 0
+
+    def lookup(self, question: str) -> Optional[CachedAnswer]:
+        version = data_version()
+        normalized = normalize_question(question)
+        hit = self._cache.get((version, normalized))
+        if hit is not None or self.similarity >= 1:
+            return hit
+
+        tokens = _tokens(normalized)
+        best, best_score = None, self.similarity
+        for (entry_version, entry_question), entry in self._cache.items():
+            if entry_version != version:
+                continue
+            score = _similarity(tokens, _tokens(entry_question))
+            if score >= best_score:
+                best, best_score = entry, score
+        if best is not None:
+            self._similar_hits += 1
+        return best
+
+    def store(self, question: str, sql: Optional[str], rows: Any, answer: str) -> CachedAnswer:
+        version = data_version()
+        entry = CachedAnswer(question, sql, rows, answer, version)
+        self._cache.set((version, normalize_question(question)), entry)
+        return entry
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        # Fuzzy hits first missed the exact key, so move them across.
+        stats["similar_hits"] = self._similar_hits
+        stats["hits"] += self._similar_hits
+        stats["misses"] -= self._similar_hits
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["data_version"] = data_version()
+        return stats
+
+
+answer_cache = AnswerCache()
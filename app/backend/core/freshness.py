@@ -0,0 +1,31 @@
+from __future__ import annotations
+import json, os, threading
+from typing import Optional, Tuple
+
+from app.backend.paths import data_path
+
+WATERMARK_PATH = data_path("order_details.watermark.json")
+
+_version_lock = threading.Lock()
+_version: Tuple[Optional[float], int] = (None, 0)
+
+
+def data_version() -> int:
+    """
+    The order extractor's ``data_version``; it only moves when new orders were loaded.
+    Caches key on it so nothing computed from older data is served. Re-reads the
+    watermark only when its mtime changes.
+    """
+    global _version
+    try:
+        mtime = os.stat(WATERMARK_PATH).st_mtime
+    except OSError:
+        return 0
+    with _version_lock:
+        if _version[0] != mtime:
+            try:
+                with open(WATERMARK_PATH) as f:
+                    _version = (mtime, int(json.load(f).get("data_version", 0)))
+            except (OSError, ValueError):
+                return _version[1]
+        return _version[1]
@@ -0,0 +1,73 @@
+from __future__ import annotations
+import threading, time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterator, Tuple
+
+
+class TTLLRUCache:
+    """
+    Thread-safe LRU cache whose entries also expire ``ttl_secs`` after being stored.
+    Keeps hit/miss/eviction counters for the metrics endpoints.
+
+    The chat caches key entries on the extractor's ``data_version``, but queries read
+    SQL Server live and data_version only moves on extractor loads, so the TTL is what
+    bounds how stale a cached entry can be.
+    """
+
+    def __init__(self, maxsize: int, ttl_secs: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl_secs = ttl_secs
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (self._clock() + self.ttl_secs, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        """Live entries, most recently used last; does not count as hits."""
+        now = self._clock()
+        with self._lock:
+            live = [(key, value) for key, (expires, value) in self._data.items() if expires > now]
+        return iter(live)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_secs": self.ttl_secs,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
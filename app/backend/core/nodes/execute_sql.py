@@ -2,11 +2,10 @@ from __future__ import annotations
 from typing import Dict, Any, Optional
 
 from pydantic import BaseModel
-from sqlalchemy import create_engine, text
-from app.backend.db_connection import create_connection
 from app.backend.core.graph import GraphState
+from app.backend.core.query_governor import run_governed
+from app.backend.core.sql_cache import sql_cache
 
-engine = create_engine("mssql+pymssql://", creator=create_connection, pool_pre_ping=True)
 
 def execute_sql(state: GraphState) -> Dict[str, Any]:
     """Executes SQL."""
@@ -15,9 +14,13 @@ def execute_sql(state: GraphState) -> Dict[str, Any]:
     
     safe_sql = state.sql
 
+    cached = sql_cache.get(safe_sql)
+    if cached is not None:
+        return {"execution_result": cached}
+
     try:
-        with engine.begin() as conn:
-            rows = conn.execute(text(safe_sql)).mappings().all()
-        return {"execution_result": [dict(row) for row in rows]}
+        result = run_governed(safe_sql)
+        sql_cache.set(safe_sql, result)
+        return {"execution_result": result}
     except Exception as e:
         return {"error": f"Query failed: {e}."}
@@ -35,6 +35,8 @@ RESPONSE_PROMPT = ChatPromptTemplate.from_template(
     {result}
 
     Please provide a natural language response to the user's question based on the database result.
+    "rows" may only be a sample: use "row_count" and "column_stats" for counts and totals, and if
+    "truncated" is true, say that the answer only covers the first rows returned.
     """
 )
 
@@ -1,11 +1,12 @@
 from __future__ import annotations
-import os, json
+import os
 from typing import Dict, Any, Optional
 from pydantic import BaseModel
 from langchain_openai import AzureChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from app.backend.core.prompts import SYSTEM_PROMPT, FEWSHOTS
 from app.backend.core.graph import GraphState
+from app.backend.core.schema_context import get_schema_context
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -43,15 +44,11 @@ SQL_PROMPT = ChatPromptTemplate.from_template(
 
 def generate_sql(state: GraphState) -> Dict[str, Any]:
     """Generates SQL."""
-    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
-    schema_path = os.path.join(project_root, 'app', 'data', 'schema.json')
-    with open(schema_path, 'r') as f:
-        schema = json.load(f)
     msg = SQL_PROMPT.format(
         system=SYSTEM_PROMPT,
         examples=examples,
         user=state.user_msg,
-        schema_json=json.dumps(schema, indent=2),
+        schema_json=get_schema_context().prompt_for(state.user_msg),
     )
     resp = llm.invoke(msg)
     content = resp.content.strip()
@@ -0,0 +1,114 @@
+from __future__ import annotations
+import contextlib, json, logging, os, re
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy import text
+
+from app.backend.core.sql_cache import canonicalize_sql
+from app.backend.db_connection import get_engine
+
+MAX_ROWS = int(os.getenv("SQL_MAX_ROWS", "1000"))
+TIMEOUT_SECS = int(os.getenv("SQL_QUERY_TIMEOUT_SECS", "30"))
+# Serialised size of the rows kept for the response prompt.
+BYTE_BUDGET = int(os.getenv("SQL_RESULT_BYTE_BUDGET", "262144"))
+SAMPLE_ROWS = int(os.getenv("SQL_SAMPLE_ROWS", "20"))
+FETCH_SIZE = int(os.getenv("SQL_FETCH_SIZE", "200"))
+
+_LEADING_SELECT = re.compile(r"^(\s*(?:--[^\n]*\n\s*)*)select(\s+distinct)?\b", re.I)
+_NO_REWRITE = re.compile(r"\b(top|offset|union|intersect|except|into|for)\b")
+
+
+def limit_rows(sql: str, max_rows: int = MAX_ROWS) -> str:
+    """
+    ``SELECT [DISTINCT] TOP (max_rows + 1) ...`` for a plain single SELECT, so the
+    server stops early; the extra row tells us the result was cut. Anything else is
+    returned unchanged and only bounded by the fetch loop.
+    """
+    key = canonicalize_sql(sql)
+    if not key.startswith("select") or ";" in key or _NO_REWRITE.search(key):
+        return sql
+    return _LEADING_SELECT.sub(lambda m: f"{m.group(1)}SELECT{m.group(2) or ''} TOP ({max_rows + 1})", sql, count=1)
+
+
+@contextlib.contextmanager
+def query_timeout(conn, secs: int = TIMEOUT_SECS) -> Iterator[None]:
+    """
+    Per-query timeout on a pooled pymssql connection. pymssql only takes a timeout at
+    connect time, so this sets it on the underlying _mssql connection and restores it
+    when the query is done.
+    """
+    mssql = getattr(conn.connection.dbapi_connection, "_conn", None)
+    previous = getattr(mssql, "query_timeout", None)
+    if previous is None or not secs:
+        yield
+        return
+    mssql.query_timeout = secs
+    try:
+        yield
+    finally:
+        with contextlib.suppress(Exception):
+            mssql.query_timeout = previous
+
+
+def _cancel(conn) -> None:
+    """Drop the unread rows of a truncated result instead of draining them on close."""
+    mssql = getattr(conn.connection.dbapi_connection, "_conn", None)
+    with contextlib.suppress(Exception):
+        mssql.cancel()
+
+
+def _row_bytes(row: Dict[str, Any]) -> int:
+    return len(json.dumps(row, default=str))
+
+
+def column_stats(rows: List[Dict[str, Any]], columns: List[str]) -> Dict[str, Dict[str, Any]]:
+    stats = {}
+    for col in columns:
+        values = [row[col] for row in rows if row[col] is not None]
+        col_stats: Dict[str, Any] = {"nulls": len(rows) - len(values)}
+        numbers = [v for v in values if isinstance(v, (int, float, Decimal)) and not isinstance(v, bool)]
+        if values and len(numbers) == len(values):
+            total = sum(numbers)
+            col_stats.update(min=min(numbers), max=max(numbers), sum=total, mean=float(total) / len(numbers))
+        elif values:
+            distinct = {str(v) for v in values}
+            col_stats.update(distinct=len(distinct), min=str(min(values, key=str)), max=str(max(values, key=str)))
+        stats[col] = col_stats
+    return stats
+
+
+def run_governed(sql: str) -> Dict[str, Any]:
+    """
+    Run ``sql`` with a timeout, fetching at most MAX_ROWS rows and BYTE_BUDGET bytes.
+    Small results come back whole; larger ones as sample rows plus per-column stats.
+    """
+    rows: List[Dict[str, Any]] = []
+    size, truncated = 0, False
+    with get_engine().begin() as conn, query_timeout(conn):
+        result = conn.execute(text(limit_rows(sql)))
+        columns = list(result.keys())
+        mapped = result.mappings()
+        while not truncated:
+            batch = mapped.fetchmany(FETCH_SIZE)
+            if not batch:
+                break
+            for row in batch:
+                row = dict(row)
+                size += _row_bytes(row)
+                if len(rows) >= MAX_ROWS or size > BYTE_BUDGET:
+                    truncated = True
+                    break
+                rows.append(row)
+        if truncated:
+            _cancel(conn)
+            result.close()
+            logging.warning(f"Query result truncated at {len(rows)} rows / {size} bytes")
+
+    summary: Dict[str, Any] = {"row_count": len(rows), "truncated": truncated, "columns": columns}
+    if len(rows) <= SAMPLE_ROWS and not truncated:
+        summary["rows"] = rows
+    else:
+        summary["rows"] = rows[:SAMPLE_ROWS]
+        summary["column_stats"] = column_stats(rows, columns)
+    return summary
@@ -1,16 +1,15 @@
 from __future__ import annotations
 import os, time
 from typing import Dict, List
-from sqlalchemy import create_engine, inspect
+from sqlalchemy import inspect
 
-from app.backend.db_connection import create_connection
+from app.backend.db_connection import get_engine
 
-_engine = create_engine("mssql+pymssql://", creator=create_connection, pool_pre_ping=True)
 _cache: Dict[str, dict] = {}
 TTL_SECS = 3600
 
 def refresh_schema() -> dict:
-    insp = inspect(_engine)
+    insp = inspect(get_engine())
     schema = "dbo"
     table = "CustOrderDetails"
     
@@ -25,7 +24,13 @@ def refresh_schema() -> dict:
             schema: {
                 table: {
                     "columns": [
-                        {"name": c["name"], "type": str(c["type"]), "nullable": c.get("nullable", True)}
+                        {
+                            "name": c["name"],
+                            "type": str(c["type"]),
+                            "nullable": c.get("nullable", True),
+                            # MS_Description, when the column has one; indexed by the schema retriever.
+                            **({"comment": c["comment"]} if c.get("comment") else {}),
+                        }
                         for c in cols
                     ]
                 }
@@ -0,0 +1,120 @@
+from __future__ import annotations
+import json, logging, os, threading, time
+from dataclasses import dataclass
+
+from app.backend.core import schema_cache
+from app.backend.core.schema_retriever import SchemaRetriever, count_tokens
+from app.backend.paths import data_path
+from app.backend.snapshot_refresher import SnapshotRefresher
+
+SCHEMA_PATH = os.getenv("SCHEMA_PATH", str(data_path("schema.json")))
+# "file" reads SCHEMA_PATH; "db" introspects SQL Server through schema_cache.
+SCHEMA_SOURCE = os.getenv("SCHEMA_SOURCE", "file")
+TTL_SECS = float(os.getenv("SCHEMA_TTL_SECS", str(schema_cache.TTL_SECS)))
+# How often the refresher checks for a changed file or an expired TTL.
+POLL_SECS = float(os.getenv("SCHEMA_POLL_SECS", "30"))
+# Schemas that render to fewer tokens than this go into every prompt whole, without
+# scoring the question against them.
+PRUNE_MIN_TOKENS = int(os.getenv("SCHEMA_PRUNE_MIN_TOKENS", "2000"))
+
+logger = logging.getLogger(__name__)
+
+
+def render(schema: dict) -> str:
+    """Schema as the prompt sees it: compact JSON, no indentation."""
+    return json.dumps(schema, separators=(",", ":"), ensure_ascii=False)
+
+
+def _file_version() -> float | None:
+    try:
+        return os.stat(SCHEMA_PATH).st_mtime
+    except OSError:
+        return None
+
+
+@dataclass(frozen=True)
+class SchemaSnapshot:
+    schema: dict
+    prompt: str
+    source: str
+    version: float | None
+    loaded_at: float
+    retriever: SchemaRetriever
+    prompt_tokens: int
+
+
+class SchemaContext(SnapshotRefresher[SchemaSnapshot]):
+    """
+    The schema the SQL prompt is built from, loaded and rendered once per process.
+    It is reloaded in the background when the file changes or the TTL expires, so a
+    question only reads the current snapshot.
+    """
+
+    name = "Schema context"
+
+    def __init__(
+        self,
+        source: str = SCHEMA_SOURCE,
+        ttl_secs: float = TTL_SECS,
+        poll_secs: float = POLL_SECS,
+        prune_min_tokens: int = PRUNE_MIN_TOKENS,
+    ):
+        super().__init__(poll_secs)
+        self.source = source
+        self.ttl_secs = ttl_secs
+        self.prune_min_tokens = prune_min_tokens
+
+    def _load(self) -> SchemaSnapshot:
+        if self.source == "db":
+            schema, version = schema_cache.refresh_schema(), None
+        else:
+            version = _file_version()
+            with open(SCHEMA_PATH, 'r') as f:
+                schema = json.load(f)
+        prompt = render(schema)
+        return SchemaSnapshot(
+            schema, prompt, self.source, version, time.time(), SchemaRetriever(schema), count_tokens(prompt)
+        )
+
+    def _stale(self, snapshot: SchemaSnapshot) -> bool:
+        if time.time() - snapshot.loaded_at > self.ttl_secs:
+            return True
+        return self.source != "db" and _file_version() != snapshot.version
+
+    def _describe(self, snapshot: SchemaSnapshot) -> str:
+        pruned = "pruned per question" if snapshot.prompt_tokens >= self.prune_min_tokens else "sent whole"
+        return f"from {snapshot.source} ({snapshot.prompt_tokens} tokens, {pruned})"
+
+    def prompt(self) -> str:
+        return self.snapshot().prompt
+
+    def prompt_for(self, question: str) -> str:
+        """
+        Only the tables and columns relevant to ``question``, rendered for the prompt.
+        A schema under ``prune_min_tokens`` is returned whole, as rendered at load.
+        """
+        snapshot = self.snapshot()
+        if snapshot.prompt_tokens < self.prune_min_tokens:
+            logger.debug(f"Schema prompt tokens: {snapshot.prompt_tokens} (whole schema)")
+            return snapshot.prompt
+        tables = snapshot.retriever.retrieve(question)
+        prompt = render(tables)
+        logger.info(
+            f"Schema prompt tokens: {snapshot.prompt_tokens} -> {count_tokens(prompt)} "
+            f"({len(tables)}/{len(snapshot.retriever.tables)} tables)"
+        )
+        return prompt
+
+
+_context: SchemaContext | None = None
+_context_lock = threading.Lock()
+
+
+def get_schema_context() -> SchemaContext:
+    """The process-wide schema context, started on first use."""
+    global _context
+    if _context is None:
+        with _context_lock:
+            if _context is None:
+                _context = SchemaContext().start()
+    return _context
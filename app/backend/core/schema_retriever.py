@@ -0,0 +1,152 @@
+from __future__ import annotations
+import math, os, re
+from collections import Counter
+from typing import Dict, List
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # optional; fall back to the ~4 chars/token rule of thumb
+    _encoding = None
+
+TOP_K_TABLES = int(os.getenv("SCHEMA_TOP_K_TABLES", "3"))
+TOP_K_COLUMNS = int(os.getenv("SCHEMA_TOP_K_COLUMNS", "12"))
+# Tables up to this many columns are kept whole: pruning them saves little and risks
+# dropping a column the question needs.
+PRUNE_MIN_COLUMNS = int(os.getenv("SCHEMA_PRUNE_MIN_COLUMNS", "40"))
+
+# Words users ask with that never appear in a column name.
+ALIASES: Dict[str, str] = {
+    "coupon": "discount promo promotion code",
+    "ordered": "placed",
+    "closing": "closed completed finished",
+    "return": "refund refunded returned",
+    "total": "revenue sales amount spend spent value",
+    "subtotal": "revenue sales amount",
+    "shipping": "delivery freight ship",
+    "status": "state cancelled canceled pending",
+    "payment": "paid pay card method psp stripe paypal",
+    "trans": "transaction charge",
+    "cust": "customer",
+    "vendor": "supplier distributor",
+}
+
+# Date and time columns also answer to these, so "in August" or "per week" finds them.
+PERIOD_TERMS = (
+    "date time day daily week weekly month monthly quarter quarterly year yearly ytd mtd when "
+    "recent last since before after between today yesterday "
+    "january february march april may june july august september october november december "
+    "jan feb mar apr jun jul aug sep sept oct nov dec"
+)
+
+_WORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+_TEMPORAL_TYPE = re.compile(r"date|time", re.I)
+
+
+def count_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return max(1, len(text) // 4)
+
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith(("ches", "shes", "xes", "sses")):
+        return word[:-2]
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased words, with CamelCase and snake_case identifiers split apart."""
+    return [_stem(w.lower()) for w in _WORD.findall(text)]
+
+
+def is_temporal(col: list) -> bool:
+    return col[1] == "T" or bool(_TEMPORAL_TYPE.search(col[1]))
+
+
+def _descriptions(col: list) -> List[str]:
+    return [extra for extra in col[2:] if extra != "!"]
+
+
+def _terms(col: list) -> List[str]:
+    """Index terms of a column: its name, aliases, description and, for dates, PERIOD_TERMS."""
+    words = tokenize(col[0])
+    terms = words + [t for w in words for t in tokenize(ALIASES.get(w, ""))]
+    terms += [t for text in _descriptions(col) for t in tokenize(text)]
+    if is_temporal(col):
+        terms += tokenize(PERIOD_TERMS)
+    return terms
+
+
+def normalize(schema: dict) -> Dict[str, list]:
+    """
+    ``{table: [[column, type, "!"?, description?], ...]}`` from either schema.json or
+    schema_cache's layout; ``"!"`` marks a non-nullable (key) column.
+    """
+    if "schemas" not in schema:
+        return {table: [list(col) for col in cols] for table, cols in schema.items()}
+    tables = {}
+    for name, table_map in schema["schemas"].items():
+        for table, meta in table_map.items():
+            tables[f"{name}.{table}"] = [
+                [c["name"], c["type"]]
+                + ([] if c.get("nullable", True) else ["!"])
+                + ([c["comment"]] if c.get("comment") else [])
+                for c in meta["columns"]
+            ]
+    return tables
+
+
+class SchemaRetriever:
+    """
+    Lexical (BM25-style) index over table and column names, column descriptions and
+    ALIASES. For each question it keeps the top-k tables and, within tables wider than
+    PRUNE_MIN_COLUMNS, the top-k columns. Key columns (flagged ``!``) and date/time
+    columns are always kept, so joins and period filters still resolve.
+    """
+
+    def __init__(
+        self,
+        schema: dict,
+        top_k_tables: int = TOP_K_TABLES,
+        top_k_columns: int = TOP_K_COLUMNS,
+        prune_min_columns: int = PRUNE_MIN_COLUMNS,
+    ):
+        self.tables = normalize(schema)
+        self.top_k_tables = top_k_tables
+        self.top_k_columns = top_k_columns
+        self.prune_min_columns = max(prune_min_columns, top_k_columns)
+        self._docs = {
+            (table, i): Counter(_terms(col) + tokenize(table.split(".")[-1]))
+            for table, cols in self.tables.items()
+            for i, col in enumerate(cols)
+        }
+        df = Counter(term for doc in self._docs.values() for term in doc)
+        n = len(self._docs)
+        self._idf = {term: math.log(1 + (n - k + 0.5) / (k + 0.5)) for term, k in df.items()}
+
+    def _score(self, doc: Counter, query: List[str]) -> float:
+        return sum(self._idf.get(t, 0.0) * doc[t] / (doc[t] + 1.2) for t in query if t in doc)
+
+    def retrieve(self, question: str) -> Dict[str, list]:
+        """The pruned schema for ``question``; the full schema if nothing matches."""
+        query = set(tokenize(question))
+        scores = {key: self._score(doc, query) for key, doc in self._docs.items()}
+        by_table: Dict[str, float] = Counter()
+        for (table, _), score in scores.items():
+            by_table[table] = max(by_table[table], score)
+        ranked = [t for t, s in sorted(by_table.items(), key=lambda kv: -kv[1]) if s > 0][: self.top_k_tables]
+        if not ranked:
+            return self.tables
+
+        pruned = {}
+        for table in ranked:
+            cols = self.tables[table]
+            if len(cols) <= self.prune_min_columns:
+                pruned[table] = cols
+                continue
+            always = {i for i, col in enumerate(cols) if "!" in col[2:] or is_temporal(col)}
+            rest = sorted(set(range(len(cols))) - always, key=lambda i: (-scores[(table, i)], i))
+            keep = always | set(rest[: self.top_k_columns])
+            pruned[table] = [col for i, col in enumerate(cols) if i in keep]
+        return pruned
@@ -1,10 +1,11 @@
 from __future__ import annotations
-import os,json,sys
+import os,json,logging,sys
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from fastapi.responses import StreamingResponse
-from typing import AsyncGenerator
+from typing import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager
 from langgraph.graph.state import CompiledStateGraph
 from decimal import Decimal
 import datetime
@@ -13,13 +14,32 @@ APP_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../'))
 if APP_ROOT not in sys.path:
     sys.path.insert(0, APP_ROOT)
 
+# The service's own loggers (app.*) log at LOG_LEVEL; libraries keep the root's WARNING.
+logging.basicConfig(format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+logging.getLogger("app").setLevel(os.getenv("LOG_LEVEL", "INFO"))
+
 class ChatReq(BaseModel):
     message: str
 
+from app.backend.core.answer_cache import answer_cache
 from app.backend.core.graph import GraphState, lg_app
 from app.backend.core.nodes.generate_response import json_converter
+from app.backend.core.schema_context import get_schema_context
+from app.backend.core.sql_cache import sql_cache
+from app.backend.db_connection import POOL_PREWARM, pool_metrics, prewarm
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Blocking, but only once and before the first request is accepted.
+    if POOL_PREWARM:
+        prewarm(POOL_PREWARM)
+    get_schema_context().snapshot()
+    yield
+    get_schema_context().stop()
 
-api = FastAPI(title="ARS Text2SQL Service")
+
+api = FastAPI(title="ARS Text2SQL Service", lifespan=lifespan)
 api.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -31,6 +51,13 @@ api.add_middleware(
 
 async def stream_chat(req: ChatReq) -> AsyncGenerator[str, None]:
     try:
+        cached = answer_cache.lookup(req.message)
+        if cached is not None:
+            yield f"data: {json.dumps({'delta': cached.answer, 'cached': True})}\n\n"
+            yield f"data: {json.dumps({'data': '[DONE]'})}\n\n"
+            return
+
+        answer, outputs = [], {}
         async for event in lg_app.astream_events({"user_msg": req.message}, version="v1"):
             ev = event.get("event") or ""
             if ev == "on_chat_model_stream" and event.get('metadata').get("langgraph_node") == "generate_response":
@@ -38,8 +65,16 @@ async def stream_chat(req: ChatReq) -> AsyncGenerator[str, None]:
                 chunk = data.get("chunk")
                 content = getattr(chunk, "content", None) if chunk is not None else None
                 if content:
+                    answer.append(content)
                     yield f"data: {json.dumps({'delta': content})}\n\n"
+            elif ev == "on_chain_end" and event.get("name") in ("generate_sql", "execute_sql"):
+                output = (event.get("data") or {}).get("output")
+                if isinstance(output, dict):
+                    outputs.update(output)
         yield f"data: {json.dumps({'data': '[DONE]'})}\n\n"
+        # Failed runs are not cached, so the next ask retries them.
+        if answer and not outputs.get("error"):
+            answer_cache.store(req.message, outputs.get("sql"), outputs.get("execution_result"), "".join(answer))
     except Exception as e:
         yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
 
@@ -56,3 +91,17 @@ async def chat(req: ChatReq):
         },
     )
 
+
+@api.get("/metrics/db-pool")
+def db_pool():
+    return pool_metrics()
+
+
+@api.get("/metrics/answer-cache")
+def answer_cache_stats():
+    return answer_cache.stats()
+
+
+@api.get("/metrics/sql-cache")
+def sql_cache_stats():
+    return sql_cache.stats()
@@ -0,0 +1,99 @@
+from __future__ import annotations
+import os, re, threading
+from typing import Any, Dict, List, Optional
+
+from app.backend.core.freshness import data_version
+from app.backend.core.lru_cache import TTLLRUCache
+
+MAX_ENTRIES = int(os.getenv("SQL_CACHE_MAX_ENTRIES", "128"))
+# How long a query's execution summary is reused before the SQL runs again.
+TTL_SECS = float(os.getenv("SQL_CACHE_TTL_SECS", "300"))
+
+_TOKEN = re.compile(
+    r"""
+    (?P<comment>--[^\n]*|/\*.*?\*/)
+    |(?P<string>[Nn]?'(?:[^']|'')*')
+    |(?P<ident>\[[^\]]+\]|"[^"]+")
+    |(?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+)
+    |(?P<word>[A-Za-z_@#][\w@#$]*)
+    |(?P<space>\s+)
+    |(?P<op>.)
+    """,
+    re.S | re.X,
+)
+_SIMPLE_IDENT = re.compile(r"[A-Za-z_][\w]*\Z")
+_CACHEABLE = ("select", "with")
+_WRITES = frozenset("insert update delete merge into exec execute drop alter create truncate".split())
+
+
+def canonicalize_sql(sql: str) -> str:
+    """
+    A cache key for ``sql``: comments dropped, whitespace collapsed, keywords and
+    identifiers case-folded (SQL Server's default collation ignores their case) and
+    simple ``[quoted]`` identifiers unquoted. String and numeric literals are kept
+    verbatim, since changing either can change the result.
+    """
+    out: List[str] = []
+    wordish = False
+    for match in _TOKEN.finditer(sql):
+        kind, text = match.lastgroup, match.group()
+        if kind in ("comment", "space"):
+            continue
+        if kind == "word":
+            text = text.lower()
+        elif kind == "ident":
+            inner = text[1:-1]
+            text = inner.lower() if _SIMPLE_IDENT.match(inner) else f"[{inner.lower()}]"
+        elif kind == "string" and text[0] == "n":
+            text = "N" + text[1:]
+        is_wordish = kind != "op"
+        if is_wordish and wordish:
+            out.append(" ")
+        out.append(text)
+        wordish = is_wordish
+    return "".join(out).rstrip(";")
+
+
+class SqlResultCache:
+    """
+    Execution summaries of read-only queries keyed on canonical SQL. Everything is dropped
+    when the extractor's ``data_version`` moves, so results never outlive a load.
+    """
+
+    def __init__(self, maxsize: int = MAX_ENTRIES, ttl_secs: float = TTL_SECS):
+        self._cache = TTLLRUCache(maxsize, ttl_secs)
+        self._version_lock = threading.Lock()
+        self._version = data_version()
+        self.invalidations = 0
+
+    def _current(self) -> int:
+        version = data_version()
+        with self._version_lock:
+            if version != self._version:
+                self._cache.clear()
+                self._version = version
+                self.invalidations += 1
+        return version
+
+    @staticmethod
+    def cacheable(key: str) -> bool:
+        return key.startswith(_CACHEABLE) and _WRITES.isdisjoint(re.findall(r"[a-z_]+", key))
+
+    def get(self, sql: str) -> Optional[Dict[str, Any]]:
+        """The cached execution summary (row_count, truncated, columns, rows) for ``sql``."""
+        key = canonicalize_sql(sql)
+        if not self.cacheable(key):
+            return None
+        return self._cache.get((self._current(), key))
+
+    def set(self, sql: str, summary: Dict[str, Any]) -> None:
+        """Cache ``summary`` as returned by query_governor.run_governed, if ``sql`` is read-only."""
+        key = canonicalize_sql(sql)
+        if self.cacheable(key):
+            self._cache.set((self._current(), key), summary)
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "invalidations": self.invalidations, "data_version": self._version}
+
+
+sql_cache = SqlResultCache()
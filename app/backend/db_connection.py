@@ -1,11 +1,28 @@
 import os
 import contextlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
 import pymssql
 from dotenv import load_dotenv
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
 
 
 load_dotenv()
 
+FETCH_BATCH_SIZE = int(os.getenv("DB_FETCH_BATCH_SIZE", "5000"))
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT_SECS = float(os.getenv("DB_POOL_TIMEOUT_SECS", "30"))
+# Recycle before SQL Server / the network drops idle sessions.
+POOL_RECYCLE_SECS = int(os.getenv("DB_POOL_RECYCLE_SECS", "1800"))
+# Connections to open when the service starts (0 = lazily).
+POOL_PREWARM = int(os.getenv("DB_POOL_PREWARM", "0"))
+
 def _get_env(name: str, default: str | None = None) -> str:
     value = os.getenv(name, default)
     if value is None:
@@ -30,6 +47,107 @@ def create_connection():
     )
 
 
+class _TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait to get a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            _count("timeouts")
+            raise
+        finally:
+            _record_wait(time.perf_counter() - started)
+
+
+_engine: Engine | None = None
+_engine_lock = threading.Lock()
+_metrics_lock = threading.Lock()
+_metrics = {"connects": 0, "checkouts": 0, "invalidated": 0, "timeouts": 0, "wait_secs_total": 0.0, "wait_secs_max": 0.0}
+
+
+def _count(name: str) -> None:
+    with _metrics_lock:
+        _metrics[name] += 1
+
+
+def _record_wait(secs: float) -> None:
+    with _metrics_lock:
+        _metrics["wait_secs_total"] += secs
+        _metrics["wait_secs_max"] = max(_metrics["wait_secs_max"], secs)
+
+
+def get_engine() -> Engine:
+    """The process-wide SQLAlchemy engine; every backend and script query goes through its pool."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = create_engine(
+                    "mssql+pymssql://",
+                    creator=create_connection,
+                    poolclass=_TimedQueuePool,
+                    pool_size=POOL_SIZE,
+                    max_overflow=POOL_MAX_OVERFLOW,
+                    pool_timeout=POOL_TIMEOUT_SECS,
+                    pool_recycle=POOL_RECYCLE_SECS,
+                    pool_pre_ping=True,
+                )
+                event.listen(engine, "connect", lambda *_: _count("connects"))
+                event.listen(engine, "checkout", lambda *_: _count("checkouts"))
+                event.listen(engine, "invalidate", lambda *_: _count("invalidated"))
+                _engine = engine
+    return _engine
+
+
+@contextlib.contextmanager
+def pooled_connection() -> Iterator:
+    """A DB-API connection borrowed from the engine's pool and returned on exit."""
+    connection = get_engine().raw_connection()
+    try:
+        yield connection
+    finally:
+        connection.close()
+
+
+def prewarm(connections: int = POOL_PREWARM) -> int:
+    """Open ``connections`` pooled connections up front so the first users don't pay for them."""
+    connections = min(connections, POOL_SIZE)
+    if connections <= 0:
+        return 0
+    engine = get_engine()
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        futures = [executor.submit(engine.raw_connection) for _ in range(connections)]
+    # Every attempt has finished; hand back the ones that opened even if another failed.
+    held = [future.result() for future in futures if future.exception() is None]
+    try:
+        for future in futures:
+            future.result()
+    finally:
+        for connection in held:
+            connection.close()
+    return len(held)
+
+
+def pool_metrics() -> dict:
+    """Pool occupancy and counters, for sizing the pool against concurrent chat users."""
+    engine = get_engine()
+    pool = engine.pool
+    with _metrics_lock:
+        metrics = dict(_metrics)
+    checkouts = metrics["checkouts"]
+    return {
+        "size": pool.size(),
+        "max_overflow": POOL_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        **metrics,
+        "wait_secs_avg": metrics["wait_secs_total"] / checkouts if checkouts else 0.0,
+    }
+
+
 def close_connection(connection) -> None:
     if connection is None:
         return
@@ -37,15 +155,29 @@ def close_connection(connection) -> None:
         connection.close()
 
 
-def list_tables(connection, query: str) -> tuple[list[tuple], list[str]]:
+def list_tables(connection, query: str, params: dict | tuple | None = None) -> tuple[list[tuple], list[str]]:
     """Run query"""
     with connection.cursor() as cursor:
-        cursor.execute(query)
+        cursor.execute(query, params)
         rows = cursor.fetchall()
         columns = [col[0] for col in cursor.description] if cursor.description else []
         return rows, columns
 
 
+def iter_batches(
+    connection, query: str, params: dict | tuple | None = None, batch_size: int = FETCH_BATCH_SIZE
+) -> Iterator[tuple[list[tuple], list[str]]]:
+    """Run query and yield (rows, columns) batches as they arrive instead of fetchall()."""
+    with connection.cursor() as cursor:
+        cursor.execute(query, params)
+        columns = [col[0] for col in cursor.description] if cursor.description else []
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows, columns
+
+
 if __name__ == "__main__":
     conn = None
     try:
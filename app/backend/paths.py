@@ -0,0 +1,8 @@
+from pathlib import Path
+
+# app/data: the extracts, local stores and schema.json shared by the backend and the dashboard.
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+
+
+def data_path(*parts: str) -> Path:
+    return DATA_DIR.joinpath(*parts)
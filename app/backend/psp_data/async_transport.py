@@ -0,0 +1,65 @@
+import asyncio
+from typing import Awaitable, Iterable, TypeVar
+from urllib.parse import urlparse
+
+import httpx
+
+from app.backend.psp_data.errors import PSPHTTPError, parse_retry_after
+from app.backend.psp_data.transport import POOL_MAXSIZE, TIMEOUT_SECS
+
+
+T = TypeVar("T")
+
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def get_async_client(base_url: str) -> httpx.AsyncClient:
+    """Shared keep-alive session for ``base_url``. Use it from a single event loop."""
+    client = _clients.get(base_url)
+    if client is None or client.is_closed:
+        url = base_url if "://" in base_url else f"https://{base_url}"
+        parsed = urlparse(url)
+        client = _clients[base_url] = httpx.AsyncClient(
+            base_url=f"{parsed.scheme}://{parsed.netloc}",
+            timeout=httpx.Timeout(TIMEOUT_SECS),
+            limits=httpx.Limits(max_connections=POOL_MAXSIZE, max_keepalive_connections=POOL_MAXSIZE),
+        )
+    return client
+
+
+async def close_async_clients() -> None:
+    clients = list(_clients.values())
+    _clients.clear()
+    await asyncio.gather(*(client.aclose() for client in clients))
+
+
+async def request_json(
+    base_url: str, method: str, path: str, payload: str, headers: dict, error_context: str
+) -> dict:
+    """Async counterpart of the PSP modules' ``_*_request`` helpers."""
+    res = await get_async_client(base_url).request(method, path, content=payload or None, headers=headers)
+    if res.status_code < 200 or res.status_code >= 300:
+        raise PSPHTTPError(
+            f"{error_context} error {res.status_code}: {res.text}",
+            res.status_code,
+            parse_retry_after(res.headers.get("Retry-After")),
+        )
+    if not res.content:
+        return {}
+    return res.json()
+
+
+async def gather_bounded(
+    aws: Iterable[Awaitable[T]], limit: int = POOL_MAXSIZE
+) -> list[T | BaseException]:
+    """
+    Await ``aws`` with at most ``limit`` in flight. Per-item failures are returned
+    in place; cancelling the caller cancels everything still pending.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(aw: Awaitable[T]) -> T:
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(run(aw) for aw in aws), return_exceptions=True)
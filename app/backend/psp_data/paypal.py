@@ -1,16 +1,34 @@
+import asyncio
 import base64
-import http.client
 import json
 import os
-from urllib.parse import urlparse
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Iterator
+from urllib.parse import urlencode, urlparse
 from dotenv import load_dotenv
 
+from app.backend.psp_data.async_transport import request_json
+from app.backend.psp_data.errors import PSPHTTPError, parse_retry_after
+from app.backend.psp_data.transport import get_pool
+
 load_dotenv()
 
 
 base_url = os.getenv("PAYPAL_API_BASE")
 PAYPAL_HOST = urlparse(base_url).netloc or base_url
 
+# The transaction search API caps each query at 31 days and 500 rows per page.
+REPORTING_WINDOW_DAYS = 31
+REPORTING_PAGE_SIZE = 500
+
+# Refresh this long before PayPal's expires_in so in-flight requests never carry a dead token.
+TOKEN_REFRESH_MARGIN_SECS = 300
+
+_token_lock = threading.Lock()
+_tokens: dict[str, tuple[str, float]] = {}
+
 
 def _basic_auth_header(client_id: str, client_secret: str) -> str:
     creds = f"{client_id}:{client_secret}".encode()
@@ -19,23 +37,27 @@ def _basic_auth_header(client_id: str, client_secret: str) -> str:
 
 def _paypal_request(method: str, path: str, payload: str, headers: dict, error_context: str) -> dict:
     """paypal request"""
-    conn = http.client.HTTPSConnection(PAYPAL_HOST)
-    conn.request(method, path, payload, headers)
-    res = conn.getresponse()
-    data = res.read()
+    res, data = get_pool(base_url).request(method, path, payload, headers)
     if res.status < 200 or res.status >= 300:
-        raise RuntimeError(f"PayPal {error_context} error {res.status}: {data.decode('utf-8', 'ignore')}")
+        raise PSPHTTPError(
+            f"PayPal {error_context} error {res.status}: {data.decode('utf-8', 'ignore')}",
+            res.status,
+            parse_retry_after(res.getheader("Retry-After")),
+        )
     if not data:
         return {}
     return json.loads(data.decode("utf-8"))
 
 
-def get_access_token(client_id: str | None = None, client_secret: str | None = None) -> str:
-    """token"""
+def _credentials(client_id: str | None, client_secret: str | None) -> tuple[str, str]:
     cid = client_id or os.getenv("PAYPAL_CLIENT_ID", "")
     csec = client_secret or os.getenv("PAYPAL_SECRET", "") or os.getenv("PAYPAL_CLIENT_SECRET", "")
     if not cid or not csec:
         raise RuntimeError("Missing PayPal creds")
+    return cid, csec
+
+
+def _request_access_token(cid: str, csec: str) -> tuple[str, float]:
     payload = "grant_type=client_credentials"
     headers = {
         "Accept": "application/json",
@@ -47,23 +69,60 @@ def get_access_token(client_id: str | None = None, client_secret: str | None = N
     token = obj.get("access_token")
     if not token:
         raise RuntimeError("No access_token")
-    return token
+    expires_at = time.monotonic() + float(obj.get("expires_in") or 0)
+    return token, expires_at
 
 
-def get_paypal_capture(transaction_id: str) -> dict:
-    """capture"""
-    if not transaction_id:
-        raise ValueError("transaction_id required")
-    access_token = get_access_token()
-    conn = http.client.HTTPSConnection(PAYPAL_HOST)
+def _fresh(cached: tuple[str, float] | None) -> bool:
+    return cached is not None and cached[1] - TOKEN_REFRESH_MARGIN_SECS > time.monotonic()
+
+
+def get_access_token(client_id: str | None = None, client_secret: str | None = None) -> str:
+    """token, cached per client until shortly before it expires"""
+    cid, csec = _credentials(client_id, client_secret)
+    cached = _tokens.get(cid)
+    if _fresh(cached):
+        return cached[0]
+    with _token_lock:
+        # Another thread may have refreshed while we waited for the lock.
+        cached = _tokens.get(cid)
+        if _fresh(cached):
+            return cached[0]
+        token, expires_at = _request_access_token(cid, csec)
+        _tokens[cid] = (token, expires_at)
+        return token
+
+
+def invalidate_access_token(token: str, client_id: str | None = None) -> None:
+    """Drop a token PayPal rejected, unless another thread already replaced it."""
+    cid = client_id or os.getenv("PAYPAL_CLIENT_ID", "")
+    with _token_lock:
+        cached = _tokens.get(cid)
+        if cached and cached[0] == token:
+            del _tokens[cid]
+
+
+def _get(path: str, access_token: str, error_context: str) -> dict:
     headers = {
         "Accept": "application/json",
         "Content-Type": "application/json",
         "Authorization": f"Bearer {access_token}",
     }
-    path = f"/v2/payments/captures/{transaction_id}"
-    capture_data = _paypal_request("GET", path, "", headers, "capture")
-    
+    return _paypal_request("GET", path, "", headers, error_context)
+
+
+def _authorized_get(path: str, error_context: str) -> dict:
+    access_token = get_access_token()
+    try:
+        return _get(path, access_token, error_context)
+    except PSPHTTPError as e:
+        if e.status != 401:
+            raise
+        invalidate_access_token(access_token)
+        return _get(path, get_access_token(), error_context)
+
+
+def _settlement(capture_data: dict) -> dict:
     breakdown = capture_data.get("seller_receivable_breakdown", {})
     gross_amount = breakdown.get("gross_amount", {})
     paypal_fee = breakdown.get("paypal_fee", {})
@@ -79,6 +138,115 @@ def get_paypal_capture(transaction_id: str) -> dict:
     return response
 
 
+def get_paypal_capture(transaction_id: str) -> dict:
+    """capture"""
+    if not transaction_id:
+        raise ValueError("transaction_id required")
+    capture_data = _authorized_get(f"/v2/payments/captures/{transaction_id}", "capture")
+    return _settlement(capture_data)
+
+
+async def _get_async(path: str, access_token: str, error_context: str) -> dict:
+    headers = {
+        "Accept": "application/json",
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {access_token}",
+    }
+    return await request_json(base_url, "GET", path, "", headers, f"PayPal {error_context}")
+
+
+async def get_access_token_async() -> str:
+    cached = _tokens.get(os.getenv("PAYPAL_CLIENT_ID", ""))
+    if _fresh(cached):
+        return cached[0]
+    # Refreshes are rare; run the locked sync path so threads and tasks share one token.
+    return await asyncio.to_thread(get_access_token)
+
+
+async def get_paypal_capture_async(transaction_id: str) -> dict:
+    """Async get_paypal_capture on the shared session"""
+    if not transaction_id:
+        raise ValueError("transaction_id required")
+    path = f"/v2/payments/captures/{transaction_id}"
+    access_token = await get_access_token_async()
+    try:
+        capture_data = await _get_async(path, access_token, "capture")
+    except PSPHTTPError as e:
+        if e.status != 401:
+            raise
+        invalidate_access_token(access_token)
+        capture_data = await _get_async(path, await get_access_token_async(), "capture")
+    return _settlement(capture_data)
+
+
+def _settlement_from_transaction(info: dict) -> dict:
+    """Reporting-API transaction_info in the same shape get_paypal_capture returns."""
+    amount = info.get("transaction_amount") or {}
+    gross = float(amount.get("value") or 0.0)
+    # The reporting API reports the fee as a negative amount.
+    fee = abs(float((info.get("fee_amount") or {}).get("value") or 0.0))
+    return {
+        "gross_amount": gross,
+        "psp_fees": fee,
+        "settlement_amount": round(gross - fee, 2),
+        "currency_code": amount.get("currency_code"),
+        "conversion_rate": 1
+    }
+
+
+def _reporting_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def list_transactions(start: datetime, end: datetime, page: int = 1, page_size: int = REPORTING_PAGE_SIZE) -> dict:
+    """One page of the transaction search API for [start, end); the range may span at most 31 days."""
+    params = {
+        "start_date": _reporting_date(start),
+        "end_date": _reporting_date(end),
+        "fields": "transaction_info",
+        "page_size": page_size,
+        "page": page,
+    }
+    return _authorized_get(f"/v1/reporting/transactions?{urlencode(params)}", "transaction search")
+
+
+def iter_transactions(
+    start: datetime,
+    end: datetime,
+    list_page: Callable[..., dict] = list_transactions,
+) -> Iterator[dict]:
+    """transaction_info of every transaction in [start, end), split into 31-day windows and paged."""
+    window_start = start
+    while window_start < end:
+        window_end = min(end, window_start + timedelta(days=REPORTING_WINDOW_DAYS))
+        page, total_pages = 1, 1
+        while page <= total_pages:
+            result = list_page(window_start, window_end, page)
+            for detail in result.get("transaction_details") or []:
+                yield detail.get("transaction_info") or {}
+            total_pages = int(result.get("total_pages") or 1)
+            page += 1
+        window_start = window_end
+
+
+def settlements_by_transaction(transactions: Iterable[dict]) -> dict[str, dict]:
+    """transaction id -> settlement for incoming payments; refunds and fee reversals are skipped."""
+    settlements = {}
+    for info in transactions:
+        transaction_id = info.get("transaction_id")
+        data = _settlement_from_transaction(info)
+        if transaction_id and data["gross_amount"] > 0:
+            settlements[transaction_id] = data
+    return settlements
+
+
+def get_paypal_settlements(start: datetime, end: datetime) -> dict[str, dict]:
+    """Bulk settlements for every PayPal transaction in a date range."""
+    return settlements_by_transaction(iter_transactions(start, end))
+
+
 if __name__ == "__main__":
     capture = get_paypal_capture("9T6730887M6016509")
     print(json.dumps(capture, indent=2))
\ No newline at end of file
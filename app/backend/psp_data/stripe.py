@@ -1,30 +1,37 @@
-import http.client
 import json
-import os,re
+import os
+from datetime import datetime
+from typing import Callable, Iterable, Iterator
 from urllib.parse import urlencode, urlparse
 
 from dotenv import load_dotenv
 
+from app.backend import business_units
+from app.backend.psp_data.async_transport import request_json
+from app.backend.psp_data.errors import PSPHTTPError, parse_retry_after
+from app.backend.psp_data.transport import get_pool
+
 load_dotenv()
 
-PREFIX_TO_KEY_MAP = {
-    "FE": "STRIPE_SECRET_KEY_PARTSFE",
-    "CEFE": "STRIPE_SECRET_KEY_PARTSFE",
-    "FEUK":"STRIPE_SECRET_KEY_PARTSFE",
-    "HnC": "STRIPE_SECRET_KEY_PARTSHNC",
-    "HnK": "STRIPE_SECRET_KEY_HNKPARTS",
-    "HT": "STRIPE_SECRET_KEY_HT",
-    "WTB": "STRIPE_SECRET_KEY_WTB"
-}
+REFUND_SUFFIX = "-refund"
+
+
+def strip_refund_suffix(transaction_id: str) -> str:
+    """The payment intent behind a transaction id; refunds are recorded as ``<intent>-refund``."""
+    if transaction_id.lower().endswith(REFUND_SUFFIX):
+        return transaction_id[: -len(REFUND_SUFFIX)]
+    return transaction_id
+
+
+def get_key_name(purchase_order_number: str) -> str:
+    unit = business_units.match(purchase_order_number)
+    if unit is None:
+        raise ValueError(f"No secret key mapping for order number: {purchase_order_number}")
+    return unit.stripe_key
+
 
 def get_secret_key(purchase_order_number: str) -> str:
-    match = re.match(r'^[a-zA-Z]+', purchase_order_number)
-    if not match:
-        raise ValueError("Invalid purchase_order_number format")
-    prefix = match.group(0)
-    key_name = PREFIX_TO_KEY_MAP.get(prefix)
-    if not key_name:
-        raise ValueError(f"No secret key mapping for prefix: {prefix}")
+    key_name = get_key_name(purchase_order_number)
     secret_key = os.getenv(key_name)
     if not secret_key:
         raise ValueError(f"Secret key not found in environment: {key_name}")
@@ -38,13 +45,12 @@ def _stripe_request(
     method: str, path: str, payload: str, headers: dict, error_context: str
 ) -> dict:
     """stripe request"""
-    conn = http.client.HTTPSConnection(STRIPE_HOST)
-    conn.request(method, path, payload, headers)
-    res = conn.getresponse()
-    data = res.read()
+    res, data = get_pool(base_url).request(method, path, payload, headers)
     if res.status < 200 or res.status >= 300:
-        raise RuntimeError(
-            f"Stripe {error_context} error {res.status}: {data.decode('utf-8', 'ignore')}"
+        raise PSPHTTPError(
+            f"Stripe {error_context} error {res.status}: {data.decode('utf-8', 'ignore')}",
+            res.status,
+            parse_retry_after(res.getheader("Retry-After")),
         )
     if not data:
         return {}
@@ -79,6 +85,16 @@ def get_balance_transactions(charge_id: str, stripe_api_key: str) -> dict:
     return _stripe_request("GET", path, "", headers, "get balance transactions")
 
 
+def _settlement(balance_transaction: dict) -> dict:
+    return {
+        "gross_amount": balance_transaction.get("amount") / 100,
+        "psp_fees": balance_transaction.get("fee") / 100,
+        "settlement_amount": balance_transaction.get("net") / 100,
+        "currency_code": balance_transaction.get("currency").upper(),
+        "conversion_rate": balance_transaction.get("exchange_rate") or 1
+    }
+
+
 def get_stripe_capture(purchase_order_number: str, payment_intent_id: str) -> dict:
     """Get settlement data"""
     stripe_api_key = get_secret_key(purchase_order_number)
@@ -87,16 +103,89 @@ def get_stripe_capture(purchase_order_number: str, payment_intent_id: str) -> di
     if not latest_charge_id:
         raise ValueError("No latest_charge found in payment intent")
     capture_data = get_balance_transactions(latest_charge_id, stripe_api_key)
-    response = {
-        "gross_amount": capture_data.get("data")[0].get("amount") /100,
-        "psp_fees": capture_data.get("data")[0].get("fee") / 100,
-        "settlement_amount": capture_data.get("data")[0].get("net") / 100,
-        "currency_code": capture_data.get("data")[0].get("currency").upper(),
-        "conversion_rate": capture_data.get("data")[0].get("exchange_rate") or 1
-    }
-    return response
+    return _settlement(capture_data.get("data")[0])
+
+
+async def _stripe_request_async(method: str, path: str, headers: dict, error_context: str) -> dict:
+    return await request_json(base_url, method, path, "", headers, f"Stripe {error_context}")
 
 
+async def get_stripe_capture_async(purchase_order_number: str, payment_intent_id: str) -> dict:
+    """Async get_stripe_capture on the shared session"""
+    if not payment_intent_id:
+        raise ValueError("payment_intent_id required")
+    stripe_api_key = get_secret_key(purchase_order_number)
+    headers = _get_auth_headers(stripe_api_key)
+    payment_intent = await _stripe_request_async(
+        "GET", f"/v1/payment_intents/{payment_intent_id}", headers, "get payment intent"
+    )
+    latest_charge_id = payment_intent.get("latest_charge")
+    if not latest_charge_id:
+        raise ValueError("No latest_charge found in payment intent")
+    path = f"/v1/balance_transactions?{urlencode({'source': latest_charge_id})}"
+    capture_data = await _stripe_request_async("GET", path, headers, "get balance transactions")
+    return _settlement(capture_data.get("data")[0])
+
+
+def list_balance_transactions(
+    stripe_api_key: str,
+    created_gte: int,
+    created_lt: int,
+    starting_after: str | None = None,
+    limit: int = 100,
+) -> dict:
+    """One page of balance transactions created in [created_gte, created_lt), with the source charge expanded."""
+    params = [
+        ("created[gte]", created_gte),
+        ("created[lt]", created_lt),
+        ("limit", limit),
+        ("expand[]", "data.source"),
+    ]
+    if starting_after:
+        params.append(("starting_after", starting_after))
+    path = f"/v1/balance_transactions?{urlencode(params)}"
+    headers = _get_auth_headers(stripe_api_key)
+    return _stripe_request("GET", path, "", headers, "list balance transactions")
+
+
+def settlements_by_payment_intent(balance_transactions: Iterable[dict]) -> dict[str, dict]:
+    """payment_intent id -> settlement, taking the latest charge when an intent has several."""
+    latest: dict[str, dict] = {}
+    for bt in balance_transactions:
+        source = bt.get("source")
+        if not isinstance(source, dict) or source.get("object") != "charge":
+            continue
+        intent = source.get("payment_intent")
+        intent_id = intent.get("id") if isinstance(intent, dict) else intent
+        if not intent_id:
+            continue
+        current = latest.get(intent_id)
+        if current is None or source.get("created", 0) >= current["source"].get("created", 0):
+            latest[intent_id] = bt
+    return {intent_id: _settlement(bt) for intent_id, bt in latest.items()}
+
+
+def iter_balance_transactions(
+    stripe_api_key: str,
+    start: datetime,
+    end: datetime,
+    list_page: Callable[..., dict] = list_balance_transactions,
+) -> Iterator[dict]:
+    created_gte, created_lt = int(start.timestamp()), int(end.timestamp())
+    starting_after = None
+    while True:
+        page = list_page(stripe_api_key, created_gte, created_lt, starting_after)
+        items = page.get("data") or []
+        yield from items
+        if not page.get("has_more") or not items:
+            return
+        starting_after = items[-1]["id"]
+
+
+def get_stripe_settlements(stripe_api_key: str, start: datetime, end: datetime) -> dict[str, dict]:
+    """Bulk settlements for one Stripe account over a date window."""
+    return settlements_by_payment_intent(iter_balance_transactions(stripe_api_key, start, end))
+
 
 if __name__ == "__main__":
     po_id = "FEUK001000081"
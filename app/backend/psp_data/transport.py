@@ -0,0 +1,119 @@
+import http.client
+import os
+import threading
+from urllib.parse import urlparse
+
+
+POOL_MAXSIZE = int(os.getenv("PSP_HTTP_POOL_SIZE", "16"))
+TIMEOUT_SECS = float(os.getenv("PSP_HTTP_TIMEOUT_SECS", "30"))
+
+# Raised when a kept-alive socket was closed by the server between requests.
+_STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionError, BrokenPipeError)
+
+
+class ConnectionPool:
+    """Bounded pool of keep-alive HTTP(S) connections to a single host."""
+
+    def __init__(self, base_url: str, maxsize: int = POOL_MAXSIZE, timeout: float = TIMEOUT_SECS):
+        parsed = urlparse(base_url if "://" in base_url else f"https://{base_url}")
+        self.scheme = parsed.scheme or "https"
+        self.host = parsed.netloc
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._idle: list[http.client.HTTPConnection] = []
+        self._slots = threading.BoundedSemaphore(maxsize)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "opened": 0, "reused": 0, "discarded": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def _open(self) -> http.client.HTTPConnection:
+        self._count("opened")
+        cls = http.client.HTTPConnection if self.scheme == "http" else http.client.HTTPSConnection
+        return cls(self.host, timeout=self.timeout)
+
+    def _acquire_slot(self) -> None:
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"Connection pool for {self.host} exhausted ({self.maxsize} in use)")
+
+    def _connect(self) -> http.client.HTTPConnection:
+        try:
+            return self._open()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _checkout(self) -> tuple[http.client.HTTPConnection, bool]:
+        self._acquire_slot()
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            return self._connect(), False
+        self._count("reused")
+        return conn, True
+
+    def _checkin(self, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            self._idle.append(conn)
+        self._slots.release()
+
+    def _discard(self, conn: http.client.HTTPConnection) -> None:
+        self._count("discarded")
+        conn.close()
+        self._slots.release()
+
+    def request(
+        self, method: str, path: str, body: str | bytes | None = None, headers: dict | None = None
+    ) -> tuple[http.client.HTTPResponse, bytes]:
+        """Send a request and return the (fully read) response with its body."""
+        self._count("requests")
+        conn, reused = self._checkout()
+        while True:
+            try:
+                conn.request(method, path, body, headers or {})
+                res = conn.getresponse()
+                data = res.read()
+            except _STALE_ERRORS:
+                self._discard(conn)
+                if not reused:
+                    raise
+                # The idle socket was closed by the server; retry once on a fresh one.
+                self._acquire_slot()
+                conn, reused = self._connect(), False
+                continue
+            except Exception:
+                self._discard(conn)
+                raise
+            if res.will_close:
+                self._discard(conn)
+            else:
+                self._checkin(conn)
+            return res, data
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_pools: dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(base_url: str) -> ConnectionPool:
+    """Process-wide pool for ``base_url``; both PSP clients go through here."""
+    with _pools_lock:
+        pool = _pools.get(base_url)
+        if pool is None:
+            pool = _pools[base_url] = ConnectionPool(base_url)
+        return pool
+
+
+def pool_stats() -> dict[str, dict[str, int]]:
+    """Request / connection counters per host, e.g. to confirm the reuse rate."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.host: dict(pool.stats, idle=len(pool._idle)) for pool in pools}
@@ -0,0 +1,74 @@
+import logging
+import threading
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotRefresher(Generic[T]):
+    """
+    A read-only snapshot loaded once per process and swapped for a new one by a
+    background thread whenever it goes stale, so readers never wait on a reload
+    after the first load. Subclasses implement ``_load`` and ``_stale``.
+    """
+
+    name = "snapshot"
+
+    def __init__(self, interval_secs: float):
+        self.interval_secs = interval_secs
+        self._snapshot: T | None = None
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher: threading.Thread | None = None
+
+    def _load(self) -> T:
+        raise NotImplementedError
+
+    def _stale(self, snapshot: T) -> bool:
+        raise NotImplementedError
+
+    def _describe(self, snapshot: T) -> str:
+        return ""
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def snapshot(self) -> T:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._load_lock:
+                if self._snapshot is None:
+                    self._snapshot = self._load()
+                    logger.info(f"{self.name} loaded {self._describe(self._snapshot)}".rstrip())
+                snapshot = self._snapshot
+        return snapshot
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload if forced or the current snapshot is stale."""
+        with self._load_lock:
+            if not force and self._snapshot is not None and not self._stale(self._snapshot):
+                return False
+            self._snapshot = self._load()
+        logger.info(f"{self.name} refreshed {self._describe(self._snapshot)}".rstrip())
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_secs):
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep serving the last good snapshot.
+                logger.error(f"{self.name} refresh failed: {e}")
+
+    def start(self):
+        if self._refresher is None:
+            thread_name = f"{self.name.lower().replace(' ', '-')}-refresher"
+            self._refresher = threading.Thread(target=self._run, name=thread_name, daemon=True)
+            self._refresher.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -2,14 +2,16 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 
-def display_categorical_charts(df):
+from app.frontend.utils.rollup import Rollup
+
+def display_categorical_charts(rollup: Rollup):
     st.subheader("Breakdowns")
 
     cols = st.columns(2, gap="medium")
 
     with cols[0]:
         st.caption("Top Vendors by Profit")
-        vendor_profit = df.groupby('Vendor Name')['margin_profit'].sum().reset_index()
+        vendor_profit = rollup.cells.groupby('Vendor Name', observed=True)['margin_profit'].sum().reset_index()
         vendor_profit = vendor_profit.sort_values('margin_profit', ascending=False).head(12)
         chart = alt.Chart(vendor_profit).mark_bar(color='#3949AB').encode(
             x=alt.X('margin_profit:Q', title='Profit'),
@@ -19,7 +21,7 @@ def display_categorical_charts(df):
 
     with cols[1]:
         st.caption("Payment Method Mix")
-        payment_method_dist = df.groupby('Payment Method')['gross_amount'].sum().reset_index()
+        payment_method_dist = rollup.cells.groupby('Payment Method', observed=True)['gross_amount'].sum().reset_index()
         chart = alt.Chart(payment_method_dist).mark_bar(color='#00897B').encode(
             x=alt.X('gross_amount:Q', title='Revenue'),
             y=alt.Y('Payment Method:N', sort='-x', title=None)
@@ -30,8 +32,8 @@ def display_categorical_charts(df):
 
     with cols[0]:
         st.caption("Monthly Revenue vs Costs")
-        df.loc[:, 'month'] = df['Purchased on'].dt.to_period('M').astype(str)
-        monthly = df.groupby('month').agg({
+        cells = rollup.cells.assign(month=rollup.cells['date'].dt.to_period('M').astype(str))
+        monthly = cells.groupby('month').agg({
             'Subtotal Purchased': 'sum',
             'Tax': 'sum',
             'Shipping': 'sum',
@@ -52,9 +54,8 @@ def display_categorical_charts(df):
 
     with cols[1]:
         st.caption("Refund Impact by Month")
-        refunds = df.copy()
-        refunds.loc[:,'month'] = refunds['Purchased on'].dt.to_period('M').astype(str)
-        refund_month = refunds[refunds['currency_code'] == 'Refunded'].groupby('month').size().reset_index(name='refund_count')
+        refunds = rollup.cells.assign(month=rollup.cells['date'].dt.to_period('M').astype(str))
+        refund_month = refunds[refunds['currency_code'] == 'Refunded'].groupby('month')['rows'].sum().reset_index(name='refund_count')
         chart = alt.Chart(refund_month).mark_bar(color='#C62828').encode(
             x=alt.X('month:N', title=None),
             y=alt.Y('refund_count:Q', title='Refunds')
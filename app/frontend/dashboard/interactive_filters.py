@@ -1,39 +1,72 @@
 import streamlit as st
 import pandas as pd
 
+from app.frontend.utils.table_view import TableIndex, number_columns
+
+PAGE_SIZES = [25, 50, 100, 250]
+
 def display_filters(df):
-    
+    return display_vendor_filter(sorted(df['Vendor Name'].dropna().astype(str).unique().tolist()))
+
+def display_vendor_filter(vendors, key="selected_vendors"):
+    """
+    Vendor toggle buttons. Each data mode passes its own ``key``, so switching modes
+    never carries over a selection made against the other mode's vendor list.
+    """
     st.subheader("Compare different Vendors")
     st.write("Vendors to compare")
-    vendors = sorted(df['Vendor Name'].dropna().astype(str).unique().tolist())
-    if 'selected_vendors' not in st.session_state:
-        st.session_state.selected_vendors = vendors[:]
+    if key not in st.session_state:
+        st.session_state[key] = vendors[:]
 
     def toggle_vendor(vendor):
-        if vendor in st.session_state.selected_vendors:
-            st.session_state.selected_vendors.remove(vendor)
+        selected = st.session_state[key]
+        if vendor in selected:
+            selected.remove(vendor)
         else:
-            st.session_state.selected_vendors.append(vendor)
+            selected.append(vendor)
 
     num_vendors = len(vendors)
     cols = st.columns(num_vendors)
 
     for i, vendor in enumerate(vendors):
-        is_selected = vendor in st.session_state.selected_vendors
+        is_selected = vendor in st.session_state[key]
         button_type = "primary" if is_selected else "secondary"
-        cols[i].button(vendor, key=f"vendor_{vendor}", on_click=toggle_vendor, args=(vendor,), type=button_type)
+        cols[i].button(vendor, key=f"{key}_{vendor}", on_click=toggle_vendor, args=(vendor,), type=button_type)
     
-    selected_vendors = st.session_state.get('selected_vendors', [])
+    selected_vendors = [v for v in st.session_state[key] if v in vendors]
     
     if not selected_vendors:
         st.warning("Select at least one vendor to see the analytics.")
 
-    filtered_df = df[
-        (df['Vendor Name'].isin(selected_vendors))
-    ]
-    
-    return filtered_df
+    # The dataset is shared by every session: hand back the selection, not a filtered copy.
+    return selected_vendors
 
-def display_tables(df):
+def display_tables(table: TableIndex, vendors):
     st.subheader("Full Data Table")
-    st.dataframe(df)
+    df = table.df
+
+    cols = st.columns([3, 2, 1, 1])
+    search = cols[0].text_input("Search order number", key="table_search")
+    sort_by = cols[1].selectbox("Sort by", list(df.columns), index=list(df.columns).index('Purchased on'), key="table_sort")
+    descending = cols[2].checkbox("Descending", value=True, key="table_desc")
+    page_size = cols[3].selectbox("Rows", PAGE_SIZES, key="table_page_size")
+
+    # Filter, search and sort run here against the shared index; only one page is sent.
+    mask = df['Vendor Name'].isin(vendors).to_numpy()
+    if search.strip():
+        mask = mask & table.matches(search)
+    positions = table.select(mask, sort_by, ascending=not descending)
+
+    pages = max(1, -(-len(positions) // page_size))
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key="table_page") - 1
+    page = min(page, pages - 1)
+    st.dataframe(table.page(positions, page, page_size), hide_index=True, column_config=number_columns(df))
+    first = page * page_size + 1 if len(positions) else 0
+    st.caption(f"Rows {first}-{min((page + 1) * page_size, len(positions))} of {len(positions)}")
+
+    if st.button("Prepare CSV export", key="table_export"):
+        with st.spinner("Exporting rows..."):
+            data = table.export_csv_gz(positions)
+        st.download_button(
+            "Download CSV", data, file_name="order_details.csv.gz", mime="application/gzip", on_click="ignore"
+        )
@@ -2,7 +2,9 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 
-def display_kpis(df):
+from app.frontend.utils.rollup import Rollup
+
+def display_kpis(rollup: Rollup):
 
     st.subheader("Executive KPIs")
     
@@ -15,16 +17,16 @@ def display_kpis(df):
     )
     
     if months:
-        df = df[df['Purchased on'].dt.month.isin(months)]
+        rollup = rollup.slice(months=months)
 
     col1, col2, col3, col4, col5, col6 = st.columns(6)
 
-    successful_orders_df = df[df['currency_code'] != 'Refunded']
-    total_revenue = successful_orders_df['gross_amount'].sum()
-    total_profit = df['margin_profit'].sum()
-    total_orders = df['Order Number'].nunique()
+    successful_orders = rollup.where(rollup.cells['currency_code'] != 'Refunded')
+    total_revenue = successful_orders.cells['gross_amount'].sum()
+    total_profit = rollup.cells['margin_profit'].sum()
+    total_orders = rollup.distinct_orders()
     aov = total_revenue / total_orders if total_orders > 0 else 0
-    total_refunded_orders = df[df['currency_code'] == 'Refunded']['Order Number'].nunique()
+    total_refunded_orders = rollup.where(rollup.cells['currency_code'] == 'Refunded').distinct_orders()
     refund_rate = (total_refunded_orders / total_orders) * 100 if total_orders > 0 else 0
     margin_pct = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
 
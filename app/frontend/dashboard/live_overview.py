@@ -0,0 +1,69 @@
+from datetime import date, datetime, timedelta
+
+import streamlit as st
+import plotly.express as px
+
+from app.frontend.queries.live import LiveFilters
+from app.frontend.utils.live_data import live_daily, live_rows, live_summary, live_vendors
+
+LIVE_PAGE_SIZE = 100
+
+
+def display_live_filters(vendors) -> LiveFilters | None:
+    """The month and date-range pickers of the KPI and payout panels, compiled for pushdown."""
+    cols = st.columns([2, 3])
+    today = date.today()
+    picked = cols[0].date_input("Select date range", [today - timedelta(days=90), today], key="live_range")
+    months = cols[1].multiselect(
+        "Select Month",
+        options=list(range(1, 13)),
+        format_func=lambda month: datetime(2024, month, 1).strftime('%B'),
+        key="live_months",
+    )
+    if len(picked) != 2:
+        st.info("Pick an end date.")
+        return None
+    start, end = picked
+    if start > end:
+        st.error("Error: End date must fall after start date.")
+        return None
+    return LiveFilters(tuple(sorted(vendors)), start, end, tuple(sorted(months)))
+
+
+def display_live_dashboard(vendors) -> None:
+    """
+    Order-side KPIs and daily totals aggregated by SQL Server. PSP settlements, fees and
+    margin only exist in the local store, so they stay in the snapshot mode.
+    """
+    st.subheader("Live Overview")
+    filters = display_live_filters(vendors)
+    if filters is None:
+        return
+
+    summary = live_summary(filters)
+    orders = int(summary.get("orders", 0))
+    total = float(summary.get("total_purchased", 0.0))
+    vendor_cost = float(summary.get("vendor_amount", 0.0))
+    rows = int(summary.get("row_count", 0))
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Total Purchased", f"${total:,.2f}")
+    col2.metric("Vendor Cost", f"${vendor_cost:,.2f}")
+    col3.metric("Total Orders", f"{orders}")
+    col4.metric("Avg Order Value", f"${(total / orders if orders else 0):,.2f}")
+
+    daily = live_daily(filters)
+    if daily.empty:
+        st.warning("No orders match the selected filters.")
+        return
+
+    st.caption("Daily Totals")
+    fig = px.bar(daily, x="day", y=["total_purchased", "vendor_amount"], barmode="group")
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(live_vendors(filters), hide_index=True)
+
+    # Rows only cross the wire when someone asks for them, a page at a time.
+    if st.toggle("Show orders", key="live_show_rows"):
+        pages = max(1, -(-rows // LIVE_PAGE_SIZE))
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key="live_page") - 1
+        st.dataframe(live_rows(filters, page, LIVE_PAGE_SIZE), hide_index=True)
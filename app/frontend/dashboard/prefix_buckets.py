@@ -1,79 +1,24 @@
 import streamlit as st
-import pandas as pd
 import altair as alt
 
+from app.backend.business_units import CODES
+from app.frontend.utils.rollup import Rollup
 
-def display_prefix_bucket_dashboard(df: pd.DataFrame) -> None:
+
+def display_prefix_bucket_dashboard(rollup: Rollup) -> None:
     """Prefix chart"""
     st.subheader("Business Units")
 
-    prefixes = ["CEFE", "FEUK", "FE", "HNC", "HNK", "HT", "WTB"]
-
-    work_df = df.copy()
-    if "Order Number" not in work_df.columns:
-        return
-
-    work_df.loc[:, "Order Number"] = work_df["Order Number"].astype(str).str.upper()
-
-    def map_bucket(s: str) -> str:
-        for p in prefixes:
-            if s.startswith(p):
-                return p
-        return "OTHER"
-
-    work_df.loc[:, "bucket"] = work_df["Order Number"].map(map_bucket)
-
-    numeric_cols = {
-        "gross_amount": 0.0,
-        "psp_fees": 0.0,
-        "Vendor Subtotal": 0.0,
-        "Vendor Shipping": 0.0,
-        "margin_profit": 0.0,
-        "settlement_amount": 0.0,
-        "Total Purchased": 0.0,
-        "currency_code": "",
-    }
-
-    for c, fill in numeric_cols.items():
-        if c in work_df.columns:
-            if c == "currency_code":
-                work_df.loc[:, c] = work_df[c].astype(str)
-            else:
-                work_df.loc[:, c] = pd.to_numeric(work_df[c], errors="coerce").fillna(fill)
-
-    if "margin_profit" not in work_df.columns and {
-        "settlement_amount",
-        "Vendor Subtotal",
-        "Vendor Shipping",
-        "psp_fees",
-    }.issubset(work_df.columns):
-        work_df.loc[:, "margin_profit"] = (
-            work_df["settlement_amount"]
-            - work_df["Vendor Subtotal"]
-            - work_df["Vendor Shipping"]
-            - work_df["psp_fees"]
-        )
+    prefixes = CODES
 
-    agg = work_df.groupby("bucket", dropna=False).agg(
-        revenue=("gross_amount", "sum"),
-        expenses=(
-            pd.NamedAgg(
-                column="psp_fees",
-                aggfunc=lambda s: s.sum(),
-            )
-        ),
-        vendor_subtotal=("Vendor Subtotal", "sum"),
-        vendor_shipping=("Vendor Shipping", "sum"),
-        margin=("margin_profit", "sum"),
-        refunds=(
-            pd.NamedAgg(
-                column="Total Purchased",
-                aggfunc=lambda s: s.where(
-                    work_df.loc[s.index, "currency_code"].astype(str).str.lower().eq("refunded")
-                ).sum(),
-            )
-        ),
-    ).reset_index()
+    agg = rollup.totals("bucket").rename(columns={
+        "gross_amount": "revenue",
+        "psp_fees": "expenses",
+        "Vendor Subtotal": "vendor_subtotal",
+        "Vendor Shipping": "vendor_shipping",
+        "margin_profit": "margin",
+        "refunded_amount": "refunds",
+    })
 
     agg.loc[:, "expenses"] = (
         agg["expenses"].fillna(0)
@@ -81,19 +26,14 @@ def display_prefix_bucket_dashboard(df: pd.DataFrame) -> None:
         + agg["vendor_shipping"].fillna(0)
     )
 
-    agg = agg[["bucket", "revenue", "expenses", "margin", "refunds"]]
-
-    agg.loc[:, "refund_rate"] = agg.apply(
-        lambda r: (r["refunds"] / r["revenue"] * 100) if r["revenue"] > 0 else 0.0,
-        axis=1,
-    )
-    agg.loc[:, "margin_rate"] = agg.apply(
-        lambda r: (r["margin"] / r["revenue"] * 100) if r["revenue"] > 0 else 0.0,
-        axis=1,
+    has_revenue = agg["revenue"] > 0
+    revenue = agg["revenue"].where(has_revenue)
+    agg = agg[["bucket", "revenue", "expenses", "margin", "refunds"]].assign(
+        refund_rate=(agg["refunds"] / revenue * 100).where(has_revenue, 0.0),
+        margin_rate=(agg["margin"] / revenue * 100).where(has_revenue, 0.0),
     )
 
-    all_buckets = pd.DataFrame({"bucket": prefixes})
-    agg = all_buckets.merge(agg, on="bucket", how="left").fillna(0)
+    agg = agg.astype({"bucket": str}).set_index("bucket").reindex(prefixes, fill_value=0).reset_index()
 
     metrics = ["revenue", "expenses", "margin", "refunds"]
 
@@ -2,23 +2,23 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 
+from app.frontend.utils.rollup import Rollup
+from app.frontend.utils.table_view import number_columns
 
-def display_refund_dashboard(df: pd.DataFrame) -> None:
-    st.subheader("Refunds")
-
-    work_df = df.copy()
 
-    # Ensure datetime & boolean
-    if not pd.api.types.is_datetime64_any_dtype(work_df["Purchased on"]):
-        work_df.loc[:, "Purchased on"] = pd.to_datetime(work_df["Purchased on"], errors="coerce")
+def display_refund_dashboard(df: pd.DataFrame, rollup: Rollup) -> None:
+    """Summaries come from ``rollup``; the margin distributions and detail table need rows."""
+    st.subheader("Refunds")
 
-    work_df.loc[:, "is_refunded"] = work_df["currency_code"].astype(str).str.lower().eq("refunded")
+    # Works on the categorical's categories rather than on every row.
+    is_refunded = df["currency_code"].str.lower().eq("refunded")
 
     # --- KPIs ---
-    total_orders = len(work_df)
-    refunded_orders = int(work_df["is_refunded"].sum())
+    totals = rollup.totals().iloc[0]
+    total_orders = int(totals["rows"])
+    refunded_orders = int(totals["refunded_rows"])
     refund_rate = (refunded_orders / total_orders * 100) if total_orders > 0 else 0.0
-    refund_amount = work_df.loc[work_df["is_refunded"], "Total Purchased"].sum()
+    refund_amount = totals["refunded_amount"]
 
     c1, c2, c3, c4 = st.columns(4)
     c1.metric("Total Orders", f"{total_orders}")
@@ -38,17 +38,12 @@ def display_refund_dashboard(df: pd.DataFrame) -> None:
     # --- Refund Trends ---
     with tabs[0]:
         st.caption("Refunds Over Time")
-        trend_df = work_df.assign(date=work_df["Purchased on"].dt.normalize())
+        daily = rollup.where(rollup.cells["date"].notna()).totals("date")
 
-        refunds_daily = (
-            trend_df.groupby("date", dropna=True)["is_refunded"].mean()
-            .mul(100)
-            .reset_index(name="refund_rate")
-        )
-        sales_daily = (
-            trend_df.groupby("date", dropna=True)["Total Purchased"].sum()
-            .reset_index(name="total_sales")
-        )
+        refunds_daily = daily.assign(
+            refund_rate=daily["refunded_rows"].div(daily["rows"]).mul(100)
+        )[["date", "refund_rate"]]
+        sales_daily = daily[["date", "Total Purchased"]].rename(columns={"Total Purchased": "total_sales"})
 
         chart_refund = (
             alt.Chart(refunds_daily)
@@ -78,12 +73,11 @@ def display_refund_dashboard(df: pd.DataFrame) -> None:
     # --- Vendor Refunds ---
     with tabs[1]:
         st.caption("Refunds by Vendor")
-        if "Vendor Name" in work_df.columns:
+        if "Vendor Name" in df.columns:
+            vendors = rollup.totals("Vendor Name")
             vendor_refunds = (
-                work_df.groupby("Vendor Name", dropna=False)["is_refunded"]
-                .mean()
-                .mul(100)
-                .reset_index(name="refund_rate")
+                vendors.assign(refund_rate=vendors["refunded_rows"].div(vendors["rows"]).mul(100))
+                [["Vendor Name", "refund_rate"]]
                 .sort_values("refund_rate", ascending=False)
             )
             chart = (
@@ -104,8 +98,8 @@ def display_refund_dashboard(df: pd.DataFrame) -> None:
     with tabs[2]:
         st.caption("Margin Profit Impact (Refunded vs Non-refunded)")
 
-        if "margin_profit" in work_df.columns:
-            mp_df = work_df[["margin_profit", "is_refunded", "Total Purchased"]].copy()
+        if "margin_profit" in df.columns:
+            mp_df = df[["margin_profit", "Total Purchased"]].assign(is_refunded=is_refunded)
             mp_df = mp_df.dropna(subset=["margin_profit"])
 
             # Summary KPIs
@@ -176,4 +170,5 @@ def display_refund_dashboard(df: pd.DataFrame) -> None:
     # --- Detailed Data ---
     with tabs[3]:
         st.caption("Refunded Orders")
-        st.dataframe(work_df[work_df["is_refunded"]])
+        refunded = df[is_refunded]
+        st.dataframe(refunded, column_config=number_columns(refunded))
@@ -2,17 +2,18 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 
-def display_time_series_charts(df):
+from app.frontend.utils.rollup import Rollup
+
+def display_time_series_charts(rollup: Rollup):
     st.subheader("Time Series")
 
-    weekly_data = df.set_index('Purchased on').resample('W').agg(
+    weekly_data = rollup.totals('date').set_index('date').resample('W').agg(
         total_profit=('margin_profit', 'sum'),
         total_revenue=('gross_amount', 'sum')
-    ).reset_index()
+    ).reset_index().rename(columns={'date': 'Purchased on'})
 
-    daily_orders = df.set_index('Purchased on').resample('D').agg(
-        order_count=('Order Number', 'nunique')
-    ).reset_index()
+    daily_orders = rollup.distinct_orders('date').dropna().resample('D').sum().reset_index(name='order_count')
+    daily_orders = daily_orders.rename(columns={'date': 'Purchased on'})
 
     cols = st.columns(2, gap="medium")
 
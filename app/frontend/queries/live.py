@@ -0,0 +1,96 @@
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from app.frontend.queries.orders import ORDERS_SELECT, VENDOR_IDS
+
+_FROM = """
+FROM
+    CustOrderDetails AS c
+INNER JOIN
+    VendorOrders AS v
+ON
+    c.CustOrderNumber = v.PONumber
+"""
+
+_MEASURES = """
+    COUNT(DISTINCT c.CustOrderNumber) AS orders,
+    COUNT(*) AS row_count,
+    SUM(c.TotalAmount) AS total_purchased,
+    SUM(c.Subtotal) AS subtotal_purchased,
+    SUM(c.TaxAmount) AS tax,
+    SUM(c.ShippingCharge) AS shipping,
+    SUM(c.CouponValue) AS discount,
+    SUM(v.TotalAmount) AS vendor_amount,
+    SUM(v.Subtotal) AS vendor_subtotal,
+    SUM(v.ShippingCharges) AS vendor_shipping
+"""
+
+
+@dataclass(frozen=True)
+class LiveFilters:
+    """Dashboard filters as pushed down to SQL Server; hashable, so usable as a cache key."""
+
+    vendors: tuple[str, ...]
+    start: date
+    end: date
+    months: tuple[int, ...] = ()
+
+
+def compile_filters(filters: LiveFilters) -> tuple[str, dict]:
+    """WHERE clause and pymssql pyformat params for ``filters``. Values are never inlined."""
+    params = {"start": filters.start, "end": filters.end + timedelta(days=1)}
+    clauses = ["c.OrderedDate >= %(start)s", "c.OrderedDate < %(end)s"]
+
+    vendor_ids = sorted({VENDOR_IDS[v] for v in filters.vendors if v in VENDOR_IDS})
+    names = [f"vendor_{i}" for i in range(len(vendor_ids))]
+    params.update(zip(names, vendor_ids))
+    # An empty selection must match nothing, as the in-memory filter does.
+    clauses.append(f"v.VendorID IN ({', '.join(f'%({n})s' for n in names)})" if names else "1 = 0")
+
+    if filters.months:
+        months = [f"month_{i}" for i in range(len(filters.months))]
+        params.update(zip(months, filters.months))
+        clauses.append(f"MONTH(c.OrderedDate) IN ({', '.join(f'%({n})s' for n in months)})")
+
+    return "WHERE\n    " + "\n    AND ".join(clauses), params
+
+
+def summary_query(filters: LiveFilters) -> tuple[str, dict]:
+    where, params = compile_filters(filters)
+    return f"SELECT{_MEASURES}{_FROM}{where};", params
+
+
+def daily_query(filters: LiveFilters) -> tuple[str, dict]:
+    where, params = compile_filters(filters)
+    query = f"""
+SELECT
+    CAST(c.OrderedDate AS date) AS day,{_MEASURES}{_FROM}{where}
+GROUP BY
+    CAST(c.OrderedDate AS date)
+ORDER BY
+    day;
+"""
+    return query, params
+
+
+def vendor_query(filters: LiveFilters) -> tuple[str, dict]:
+    where, params = compile_filters(filters)
+    query = f"""
+SELECT
+    v.VendorID AS vendor_id,{_MEASURES}{_FROM}{where}
+GROUP BY
+    v.VendorID;
+"""
+    return query, params
+
+
+def rows_query(filters: LiveFilters, offset: int, limit: int) -> tuple[str, dict]:
+    """One page of row-level orders, newest first."""
+    where, params = compile_filters(filters)
+    params.update(offset=offset, limit=limit)
+    query = ORDERS_SELECT + f"""{where}
+ORDER BY
+    c.OrderedDate DESC, c.CustOrderNumber
+OFFSET %(offset)s ROWS FETCH NEXT %(limit)s ROWS ONLY;
+"""
+    return query, params
@@ -1,4 +1,17 @@
-DEFAULT_QUERY = """
+# VendorOrders.VendorID per vendor name. ORDERS_SELECT decodes the IDs with it and the
+# live queries encode vendor filters with it.
+VENDOR_IDS = {
+    "AllPoints": 1,
+    "ReliableParts": 2,
+    "Neuco": 3,
+    "Metropac": 4,
+    "Encompass": 5,
+    "UED": 6,
+    "DLWholesale": 7,
+}
+_VENDOR_CASES = "\n".join(f"        WHEN {vendor_id} THEN '{name}'" for name, vendor_id in VENDOR_IDS.items())
+
+ORDERS_SELECT = f"""
 SELECT
     c.CustOrderNumber as 'Order Number',
     c.OrderedDate as 'Purchased on',
@@ -11,26 +24,35 @@ SELECT
     v.Subtotal as 'Vendor Subtotal',
     v.ShippingCharges as 'Vendor Shipping',
     CASE v.VendorID
-        WHEN 1 THEN 'AllPoints'
-        WHEN 2 THEN 'ReliableParts'
-        WHEN 3 THEN 'Neuco'
-        WHEN 4 THEN 'Metropac'
-        WHEN 5 THEN 'Encompass'
-        WHEN 6 THEN 'UED'
-        WHEN 7 THEN 'DLWholesale'
+{_VENDOR_CASES}
         ELSE 'Unknown'
     END as 'Vendor Name',
     c.PaymentMethod as 'Payment Method',
-    c.PaymentTransId as 'Payment Transaction ID'
-    c.Return
+    c.PaymentTransId as 'Payment Transaction ID',
+    c.[Return] as 'Return'
 FROM
     CustOrderDetails AS c
 INNER JOIN
     VendorOrders AS v
 ON
     c.CustOrderNumber = v.PONumber
+"""
+
+# Earliest orders the extract covers; full and incremental runs both apply it.
+ORDERS_FLOOR = "2025-07-01"
+
+DEFAULT_QUERY = ORDERS_SELECT + f"""
+WHERE
+    c.OrderedDate >= '{ORDERS_FLOOR}'
+ORDER BY
+    c.OrderedDate DESC;
+"""
+
+# Orders placed or closed since the extractor's watermark (pymssql pyformat params).
+INCREMENTAL_QUERY = ORDERS_SELECT + f"""
 WHERE
-    c.OrderedDate >= '2025-07-01'
+    c.OrderedDate >= '{ORDERS_FLOOR}'
+    AND (c.OrderedDate >= %(since)s OR c.OrderClosingDate >= %(since)s)
 ORDER BY
     c.OrderedDate DESC;
 """
@@ -7,8 +7,10 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 from app.frontend.dashboard.kpis import display_kpis
-from app.frontend.dashboard.interactive_filters import display_filters, display_tables
-from scripts.order_details import get_order_details
+from app.frontend.dashboard.interactive_filters import display_filters, display_tables, display_vendor_filter
+from app.frontend.dashboard.live_overview import display_live_dashboard
+from app.frontend.queries.orders import VENDOR_IDS
+from app.frontend.utils.enriched_dataset import load_snapshot
 from app.frontend.dashboard.agent_chat import display_agent_chat
 from app.frontend.dashboard.daily_payouts import display_daily_payouts
 load_dotenv()
@@ -19,19 +21,22 @@ def run():
 
     with tabs[0]:
         st.title("Executive Overview")
+        mode = st.radio("Data", ["Snapshot", "Live (SQL Server)"], horizontal=True, key="data_mode")
         try:
-            df = get_order_details()
-            df.to_csv("app/data/order_details_with_psp.csv", index=False)
-            if not df.empty:
-                filtered_df = display_filters(df)
-                display_kpis(filtered_df)
-                display_tables(filtered_df)
-                display_daily_payouts(filtered_df)
+            if mode != "Snapshot":
+                display_live_dashboard(display_vendor_filter(sorted(VENDOR_IDS), key="live_vendors"))
+            elif not (snapshot := load_snapshot()).orders.empty:
+                df = snapshot.orders
+                vendors = display_filters(df)
+                rollup = snapshot.rollup.slice(vendors=vendors)
+                display_kpis(rollup)
+                display_tables(snapshot.table, vendors)
+                display_daily_payouts(rollup)
                 
-                # display_time_series_charts(filtered_df)
-                # display_categorical_charts(filtered_df)
-                # display_prefix_bucket_dashboard(filtered_df)
-                # display_refund_dashboard(filtered_df)
+                # display_time_series_charts(rollup)
+                # display_categorical_charts(rollup)
+                # display_prefix_bucket_dashboard(rollup)
+                # display_refund_dashboard(df[df['Vendor Name'].isin(vendors)], rollup)
             else:
                 st.write("No data to display.")
         except Exception as e:
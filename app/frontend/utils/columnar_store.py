@@ -0,0 +1,230 @@
+import shutil
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from app.backend.paths import DATA_DIR
+
+
+ORDER_DATE = "Purchased on"
+PARTITION = "month"
+# SQL Server datetime carries milliseconds; both write paths truncate to this unit.
+ORDER_DATE_TYPE = pa.timestamp("ms")
+
+# Typed layout of order_details; columns the query adds later are inferred.
+ORDER_TYPES = {
+    "Order Number": pa.string(),
+    ORDER_DATE: ORDER_DATE_TYPE,
+    "Total Purchased": pa.float64(),
+    "Subtotal Purchased": pa.float64(),
+    "Tax": pa.float64(),
+    "Shipping": pa.float64(),
+    "Discount": pa.float64(),
+    "Vendor Amount": pa.float64(),
+    "Vendor Subtotal": pa.float64(),
+    "Vendor Shipping": pa.float64(),
+    "Vendor Name": pa.string(),
+    "Payment Method": pa.string(),
+    "Payment Transaction ID": pa.string(),
+}
+
+PSP_SCHEMA = pa.schema([
+    ("payment_method", pa.string()),
+    ("transaction_id", pa.string()),
+    ("order_number", pa.string()),
+    ("gross_amount", pa.float64()),
+    ("psp_fees", pa.float64()),
+    ("settlement_amount", pa.float64()),
+    ("currency_code", pa.string()),
+    ("conversion_rate", pa.float64()),
+])
+
+
+def order_details_dir() -> Path:
+    return DATA_DIR / "store" / "order_details"
+
+
+def psp_data_path() -> Path:
+    return DATA_DIR / "store" / "psp_data.parquet"
+
+
+def enriched_path() -> Path:
+    return DATA_DIR / "store" / "enriched_orders.parquet"
+
+
+def enriched_fingerprints_path() -> Path:
+    return DATA_DIR / "store" / "enriched_fingerprints.parquet"
+
+
+def _partitioning() -> ds.Partitioning:
+    return ds.partitioning(pa.schema([(PARTITION, pa.string())]), flavor="hive")
+
+
+def _with_month(batch: pa.RecordBatch) -> pa.RecordBatch:
+    month = pc.strftime(batch.column(ORDER_DATE), format="%Y-%m")
+    return pa.RecordBatch.from_arrays([*batch.columns, month], names=[*batch.schema.names, PARTITION])
+
+
+def _write(batches: Iterable[pa.RecordBatch], schema: pa.Schema) -> None:
+    ds.write_dataset(
+        batches,
+        order_details_dir(),
+        schema=schema.append(pa.field(PARTITION, pa.string())),
+        format="parquet",
+        partitioning=_partitioning(),
+        basename_template="part-{i}.parquet",
+        # Only the months present in this write are replaced.
+        existing_data_behavior="delete_matching",
+    )
+
+
+def order_details_table(df: pd.DataFrame) -> pa.Table:
+    """Coerce an order_details frame (from the DB or the CSV) to the typed layout."""
+    df = df.copy()
+    for col, typ in ORDER_TYPES.items():
+        if col not in df.columns:
+            continue
+        if typ == pa.float64():
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+        elif col == ORDER_DATE:
+            df[col] = pd.to_datetime(df[col], errors="coerce").astype("datetime64[ms]")
+        else:
+            df[col] = df[col].astype("string")
+    fields = [pa.field(c, ORDER_TYPES[c]) for c in df.columns if c in ORDER_TYPES]
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return table.cast(pa.schema(fields + [f for f in table.schema if f.name not in ORDER_TYPES]))
+
+
+def write_order_details(df: pd.DataFrame) -> None:
+    """Rewrite the month partitions covered by ``df`` (pass whole months)."""
+    if df.empty:
+        return
+    table = order_details_table(df)
+    _write((_with_month(b) for b in table.to_batches()), table.schema)
+
+
+def _truncate_dates(batch: pa.RecordBatch) -> pa.RecordBatch:
+    i = batch.schema.get_field_index(ORDER_DATE)
+    dates = pc.cast(batch.column(i), ORDER_DATE_TYPE, safe=False)
+    return pa.RecordBatch.from_arrays(
+        [dates if j == i else col for j, col in enumerate(batch.columns)], names=batch.schema.names
+    )
+
+
+def write_order_details_from_csv(csv_path: str | Path, block_size: int = 1 << 22) -> None:
+    """Convert the extractor's CSV into the partitioned store, streaming it in blocks."""
+    shutil.rmtree(order_details_dir(), ignore_errors=True)
+    # Arrow's CSV parser rejects fractions finer than the target unit, so parse at
+    # microseconds (pandas writes 6 digits) and truncate like order_details_table does.
+    reader = pa_csv.open_csv(
+        csv_path,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        convert_options=pa_csv.ConvertOptions(column_types={**ORDER_TYPES, ORDER_DATE: pa.timestamp("us")}),
+    )
+    schema = reader.schema.set(
+        reader.schema.get_field_index(ORDER_DATE), pa.field(ORDER_DATE, ORDER_DATE_TYPE)
+    )
+    _write((_with_month(_truncate_dates(b)) for b in reader), schema)
+
+
+def _months(start: date | None, end: date | None) -> ds.Expression | None:
+    expr = None
+    if start is not None:
+        expr = ds.field(PARTITION) >= f"{start:%Y-%m}"
+    if end is not None:
+        upper = ds.field(PARTITION) <= f"{end:%Y-%m}"
+        expr = upper if expr is None else expr & upper
+    return expr
+
+
+def _dates(start: date | None, end: date | None) -> ds.Expression | None:
+    expr = None
+    if start is not None:
+        expr = ds.field(ORDER_DATE) >= pa.scalar(datetime.combine(start, datetime.min.time()), ORDER_DATE_TYPE)
+    if end is not None:
+        upper = ds.field(ORDER_DATE) <= pa.scalar(datetime.combine(end, datetime.max.time()), ORDER_DATE_TYPE)
+        expr = upper if expr is None else expr & upper
+    return expr
+
+
+def has_order_details() -> bool:
+    path = order_details_dir()
+    return path.exists() and any(path.rglob("*.parquet"))
+
+
+def _order_details_dataset() -> ds.Dataset:
+    return ds.dataset(order_details_dir(), format="parquet", partitioning=_partitioning())
+
+
+def order_details_columns() -> list[str]:
+    """Columns of the stored orders, without the month partition key."""
+    return [n for n in _order_details_dataset().schema.names if n != PARTITION]
+
+
+def read_order_details(
+    columns: list[str] | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    months: Iterable[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Read orders placed between ``start`` and ``end`` (inclusive), optionally only in the
+    given ``YYYY-MM`` months. Month partitions outside the range are skipped and the
+    date predicate is pushed down to the row groups.
+    """
+    dataset = _order_details_dataset()
+    dates = _dates(start, end)
+    expr = None if dates is None else dates & _months(start, end)
+    if months is not None:
+        in_months = ds.field(PARTITION).isin(pa.array(sorted(months), pa.string()))
+        expr = in_months if expr is None else expr & in_months
+    if columns is None:
+        columns = [n for n in dataset.schema.names if n != PARTITION]
+    return dataset.to_table(columns=columns, filter=expr).to_pandas()
+
+
+def write_psp_data(rows: Iterable[tuple]) -> None:
+    """Write PSP settlements (in ``PSP_SCHEMA`` column order) as one typed Parquet file."""
+    path = psp_data_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    columns = list(zip(*rows)) or [[] for _ in PSP_SCHEMA]
+    table = pa.Table.from_arrays([pa.array(c, type=f.type) for c, f in zip(columns, PSP_SCHEMA)], schema=PSP_SCHEMA)
+    tmp = path.with_suffix(".tmp")
+    pq.write_table(table, tmp)
+    tmp.replace(path)
+
+
+def write_frame(df: pd.DataFrame, path: Path, index: bool = False) -> None:
+    """Atomically replace a single-file Parquet table."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    df.to_parquet(tmp, index=index)
+    tmp.replace(path)
+
+
+def read_psp_data(columns: list[str] | None = None, order_numbers: Iterable[str] | None = None) -> pd.DataFrame:
+    filter_expr = None
+    if order_numbers is not None:
+        filter_expr = ds.field("order_number").isin(pa.array(list(order_numbers), pa.string()))
+    return ds.dataset(psp_data_path(), format="parquet").to_table(columns=columns, filter=filter_expr).to_pandas()
+
+
+def last_modified(path: Path) -> float | None:
+    if path.is_dir():
+        return max((p.stat().st_mtime for p in path.rglob("*.parquet")), default=None)
+    return path.stat().st_mtime if path.exists() else None
+
+
+def is_fresh(columnar: Path, source: Path) -> bool:
+    """True when the columnar copy exists and is at least as new as its CSV source."""
+    columnar_mtime, source_mtime = last_modified(columnar), last_modified(source)
+    if columnar_mtime is None:
+        return False
+    return source_mtime is None or columnar_mtime >= source_mtime
@@ -0,0 +1,74 @@
+import os
+from dataclasses import dataclass
+
+import pandas as pd
+import streamlit as st
+
+from app.backend.snapshot_refresher import SnapshotRefresher
+from app.frontend.utils import columnar_store
+from app.frontend.utils.rollup import Rollup, build_rollup
+from app.frontend.utils.table_view import TableIndex
+from scripts.order_details import ORDER_DETAILS_CSV, PSP_DATA_CSV, get_enriched_orders
+
+# Sessions share one frame; copy-on-write turns any mutation of it (or of a slice of it)
+# into a private copy instead of a change every other session would see.
+pd.set_option("mode.copy_on_write", True)
+
+REFRESH_SECS = float(os.getenv("DASHBOARD_REFRESH_SECS", "60"))
+
+
+def data_version() -> tuple:
+    """Changes whenever any source of the enriched dataset is rewritten or appended to."""
+    sources = [
+        ORDER_DETAILS_CSV,
+        PSP_DATA_CSV,
+        columnar_store.order_details_dir(),
+        columnar_store.psp_data_path(),
+    ]
+    return tuple(columnar_store.last_modified(path) for path in sources)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    version: tuple
+    orders: pd.DataFrame
+    rollup: Rollup
+    table: TableIndex
+
+
+class SharedDataset(SnapshotRefresher[Snapshot]):
+    """
+    One read-only enriched dataset and rollup per server process. Sessions read the
+    current snapshot; a background thread swaps in a new one when the sources
+    change, so a rerun never waits on a rebuild after the first load.
+    """
+
+    name = "Dashboard dataset"
+
+    def __init__(self, refresh_secs: float = REFRESH_SECS):
+        super().__init__(refresh_secs)
+
+    def _load(self) -> Snapshot:
+        version = data_version()
+        orders = get_enriched_orders()
+        return Snapshot(version, orders, build_rollup(orders), TableIndex(orders))
+
+    def _stale(self, snapshot: Snapshot) -> bool:
+        return snapshot.version != data_version()
+
+    def _describe(self, snapshot: Snapshot) -> str:
+        return f"({len(snapshot.orders)} rows)"
+
+
+@st.cache_resource(show_spinner=False)
+def shared_dataset() -> SharedDataset:
+    return SharedDataset().start()
+
+
+def load_snapshot() -> Snapshot:
+    """The process-wide snapshot; its frames are shared with every session, never copied."""
+    dataset = shared_dataset()
+    if dataset.loaded:
+        return dataset.snapshot()
+    with st.spinner("Loading orders..."):
+        return dataset.snapshot()
@@ -2,34 +2,20 @@ import os
 import csv
 import logging
 from pathlib import Path
-from app.backend.psp_data.paypal import get_paypal_capture
-from app.backend.psp_data.stripe import get_stripe_capture
-from app.backend.db_connection import create_connection, list_tables
-from app.frontend.queries.orders import DEFAULT_QUERY
-import pandas as pd
-from tqdm import tqdm
-import time
+from app.backend.psp_data.paypal import get_paypal_capture, get_paypal_capture_async
+from app.backend.psp_data.stripe import get_stripe_capture, get_stripe_capture_async, strip_refund_suffix
+from app.frontend.utils import psp_cache
+from app.frontend.utils.psp_cache import CACHE_HEADERS
+import threading
 
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-CACHE_HEADERS = [
-    "payment_method",
-    "transaction_id",
-    "order_number",
-    "gross_amount",
-    "psp_fees",
-    "settlement_amount",
-    "currency_code",
-    "conversion_rate",
-]
-
-intent_id = None
+_csv_lock = threading.Lock()
 
 def _cache_path() -> Path:
-    base = Path(__file__).resolve().parents[2]
-    return base / "data" / "psp_data.csv"
+    return psp_cache.csv_path()
 
 
 def _ensure_cache():
@@ -42,46 +28,35 @@ def _ensure_cache():
 
 
 def _read_cached(payment_method: str, transaction_id: str, order_number: str) -> dict | None:
-    path = _cache_path()
-    if not path.exists():
-        return None
-    with path.open("r", newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if "paypal" in payment_method.lower():
-                if (
-                    row.get("payment_method", "").lower() == "paypal"
-                    and row.get("transaction_id") == transaction_id
-                ):
-                    return {
-                        "gross_amount": float(row.get("gross_amount") or 0.0),
-                        "psp_fees": float(row.get("psp_fees") or 0.0),
-                        "settlement_amount": float(row.get("settlement_amount") or 0.0),
-                        "currency_code": row.get("currency_code") or None,
-                        "conversion_rate": float(row.get("conversion_rate") or 1.0),
-                    }
-            elif "stripe" in payment_method.lower():
-                if (
-                    row.get("payment_method", "").lower() == "stripe"
-                    and row.get("transaction_id") == transaction_id
-                    and row.get("order_number") == (order_number or "")
-                ):
-                    return {
-                        "gross_amount": float(row.get("gross_amount") or 0.0),
-                        "psp_fees": float(row.get("psp_fees") or 0.0),
-                        "settlement_amount": float(row.get("settlement_amount") or 0.0),
-                        "currency_code": row.get("currency_code") or None,
-                        "conversion_rate": float(row.get("conversion_rate") or 1.0),
-                    }
-    return None
+    return psp_cache.get(payment_method, transaction_id, order_number)
 
 
 def _append_cache(payment_method: str, transaction_id: str, order_number: str, data: dict) -> None:
+    psp_cache.put(payment_method, transaction_id, order_number, data)
+    # The CSV stays the export consumed by scripts/order_details.py.
+    with _csv_lock:
+        _write_csv_row(payment_method, transaction_id, order_number, data)
+
+
+def _append_cache_many(records: list[tuple[str, str, str, dict]]) -> None:
+    """Cache ``(payment_method, transaction_id, order_number, data)`` records in one pass."""
+    if not records:
+        return
+    psp_cache.put_many(records)
+    with _csv_lock:
+        _write_csv_rows(records)
+
+
+def _write_csv_row(payment_method: str, transaction_id: str, order_number: str, data: dict) -> None:
+    _write_csv_rows([(payment_method, transaction_id, order_number, data)])
+
+
+def _write_csv_rows(records: list[tuple[str, str, str, dict]]) -> None:
     _ensure_cache()
     path = _cache_path()
     with path.open("a", newline="") as f:
         writer = csv.DictWriter(f, fieldnames=CACHE_HEADERS)
-        writer.writerow({
+        writer.writerows({
             "payment_method": payment_method.lower(),
             "transaction_id": transaction_id,
             "order_number": order_number or "",
@@ -90,20 +65,46 @@ def _append_cache(payment_method: str, transaction_id: str, order_number: str, d
             "settlement_amount": data.get("settlement_amount", 0.0),
             "currency_code": data.get("currency_code"),
             "conversion_rate": data.get("conversion_rate", 1.0),
-        })
+        } for payment_method, transaction_id, order_number, data in records)
 
 
-def fetch_psp_data(payment_method: str, transaction_id: str, order_number: str) -> dict:
-    """
-    PSP data
-    """
-    psp_data = {
+def fetch_remote_psp_data(payment_method: str, transaction_id: str, order_number: str) -> dict:
+    """Fetch settlement data from the PSP, raising on failure."""
+    if "paypal" in payment_method.lower():
+        logging.info(f"Fetching PayPal data for transaction ID: {transaction_id}")
+        return get_paypal_capture(transaction_id)
+    if "stripe" in payment_method.lower():
+        logging.info(
+            f"Fetching Stripe data for order number: {order_number}, payment intent ID: {transaction_id}"
+        )
+        return get_stripe_capture(order_number, strip_refund_suffix(transaction_id))
+    return {}
+
+
+async def fetch_remote_psp_data_async(payment_method: str, transaction_id: str, order_number: str) -> dict:
+    """Async fetch_remote_psp_data, for fanning lookups out on one event loop."""
+    if "paypal" in payment_method.lower():
+        return await get_paypal_capture_async(transaction_id)
+    if "stripe" in payment_method.lower():
+        return await get_stripe_capture_async(order_number, strip_refund_suffix(transaction_id))
+    return {}
+
+
+def default_psp_data() -> dict:
+    return {
         "gross_amount": 0.0,
         "psp_fees": 0.0,
         "settlement_amount": 0.0,
         "currency_code": "Refunded",
         "conversion_rate": 1,
         }
+
+
+def fetch_psp_data(payment_method: str, transaction_id: str, order_number: str) -> dict:
+    """
+    PSP data
+    """
+    psp_data = default_psp_data()
     try:
         if not payment_method or not transaction_id:
             return psp_data
@@ -113,20 +114,8 @@ def fetch_psp_data(payment_method: str, transaction_id: str, order_number: str)
             logging.info(f"Cached data found for {payment_method} transaction {transaction_id}")
             return cached
 
-        if "paypal" in payment_method.lower():
-            logging.info(f"Fetching PayPal data for transaction ID: {transaction_id}")
-            data = get_paypal_capture(transaction_id)
-            psp_data.update(data)
-            _append_cache(payment_method, transaction_id,order_number, psp_data)
-        elif "stripe" in payment_method.lower():
-            if transaction_id.lower().endswith("-refund"):
-                intent_id = transaction_id.replace("-refund", "")
-            else:
-                intent_id = transaction_id
-            logging.info(
-                f"Fetching Stripe data for order number: {order_number}, payment intent ID: {transaction_id}"
-            )
-            data = get_stripe_capture(order_number, intent_id)
+        data = fetch_remote_psp_data(payment_method, transaction_id, order_number)
+        if data:
             psp_data.update(data)
             _append_cache(payment_method, transaction_id, order_number, psp_data)
     except Exception as e:
@@ -137,25 +126,6 @@ def fetch_psp_data(payment_method: str, transaction_id: str, order_number: str)
     return psp_data
 
 if __name__ == "__main__":
-    conn = create_connection()
-    rows, columns = list_tables(conn, DEFAULT_QUERY)
-    print(len(rows))
-    if rows:
-        df = pd.DataFrame(rows, columns=columns if columns else None)
-    else:
-        df = pd.DataFrame(columns=columns if columns else None)
-
-    batch_size = 500
-    num_rows = len(df)
-
-    for i in range(0, num_rows, batch_size):
-        batch_df = df.iloc[i:i + batch_size]
-        
-        for index, row in tqdm(batch_df.iterrows(), total=len(batch_df), desc=f"Caching batch {i // batch_size + 1}", unit="row"):
-            fetch_psp_data(row["Payment Method"], row["Payment Transaction ID"], row["Order Number"])
-
-        if i + batch_size < num_rows:
-            logging.info("Taking a 3-minute break...")
-            time.sleep(180)
-            
-    print("PSP data cached successfully")
\ No newline at end of file
+    from app.frontend.utils.psp_backfill import main
+
+    main()
@@ -0,0 +1,55 @@
+import os
+
+import pandas as pd
+import streamlit as st
+
+from app.backend.db_connection import list_tables, pooled_connection
+from app.frontend.queries.live import LiveFilters, daily_query, rows_query, summary_query, vendor_query
+from app.frontend.queries.orders import VENDOR_IDS
+
+LIVE_CACHE_TTL_SECS = int(os.getenv("DASHBOARD_LIVE_CACHE_TTL_SECS", "300"))
+VENDOR_NAMES = {vendor_id: name for name, vendor_id in VENDOR_IDS.items()}
+
+
+def _query(query: str, params: dict) -> pd.DataFrame:
+    with pooled_connection() as conn:
+        rows, columns = list_tables(conn, query, params)
+    return pd.DataFrame.from_records(rows, columns=columns)
+
+
+def _aggregates(query: str, params: dict, keys: list[str]) -> pd.DataFrame:
+    """
+    Run an aggregate query; SUMs arrive as Decimal and are converted to floats. A SUM
+    over no rows is NULL, which reads as 0 here.
+    """
+    df = _query(query, params)
+    for col in df.columns.difference(keys):
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64").fillna(0.0)
+    return df
+
+
+# Each cache entry is keyed by the filter tuple; only aggregates are fetched and kept.
+@st.cache_data(ttl=LIVE_CACHE_TTL_SECS, show_spinner="Querying SQL Server...", max_entries=64)
+def live_summary(filters: LiveFilters) -> pd.Series:
+    df = _aggregates(*summary_query(filters), keys=[])
+    return df.iloc[0] if not df.empty else pd.Series(dtype="float64")
+
+
+@st.cache_data(ttl=LIVE_CACHE_TTL_SECS, show_spinner="Querying SQL Server...", max_entries=64)
+def live_daily(filters: LiveFilters) -> pd.DataFrame:
+    df = _aggregates(*daily_query(filters), keys=["day"])
+    if not df.empty:
+        df["day"] = pd.to_datetime(df["day"])
+    return df
+
+
+@st.cache_data(ttl=LIVE_CACHE_TTL_SECS, show_spinner="Querying SQL Server...", max_entries=64)
+def live_vendors(filters: LiveFilters) -> pd.DataFrame:
+    df = _aggregates(*vendor_query(filters), keys=["vendor_id"])
+    df.insert(0, "Vendor Name", df.pop("vendor_id").map(VENDOR_NAMES).fillna("Unknown"))
+    return df
+
+
+@st.cache_data(ttl=LIVE_CACHE_TTL_SECS, show_spinner="Loading rows...", max_entries=16)
+def live_rows(filters: LiveFilters, page: int, page_size: int) -> pd.DataFrame:
+    return _query(*rows_query(filters, page * page_size, page_size))
@@ -0,0 +1,417 @@
+import argparse
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, TypeVar
+
+import pandas as pd
+from tqdm import tqdm
+
+from app.backend import business_units
+from app.backend.db_connection import list_tables, pooled_connection
+from app.backend.psp_data.errors import PSPHTTPError
+from app.backend.psp_data.paypal import iter_transactions, list_transactions, settlements_by_transaction
+from app.backend.psp_data.stripe import (
+    iter_balance_transactions,
+    list_balance_transactions,
+    settlements_by_payment_intent,
+    strip_refund_suffix,
+)
+from app.backend.psp_data.transport import pool_stats
+from app.frontend.queries.orders import DEFAULT_QUERY
+from app.frontend.utils import columnar_store, psp_cache
+from app.frontend.utils.get_psp_data import (
+    _append_cache,
+    _append_cache_many,
+    default_psp_data,
+    fetch_remote_psp_data,
+)
+from scripts.order_details import ORDER_DETAILS_CSV
+
+
+T = TypeVar("T")
+
+WORKERS = int(os.getenv("PSP_BACKFILL_WORKERS", "16"))
+MAX_RETRIES = int(os.getenv("PSP_BACKFILL_MAX_RETRIES", "6"))
+# Settle orders from bulk Stripe / PayPal listings before per-order lookups.
+BULK = os.getenv("PSP_BACKFILL_BULK", "1") == "1"
+# Below this many pending orders per Stripe key (or for PayPal), per-order lookups cost
+# fewer round-trips than listing every transaction in their window.
+BULK_MIN_TASKS = int(os.getenv("PSP_BACKFILL_BULK_MIN_TASKS", "50"))
+
+# Requests per second allowed against each limiter, and API calls a single lookup costs.
+PROVIDER_RPS = {
+    "paypal": float(os.getenv("PSP_BACKFILL_PAYPAL_RPS", "10")),
+    "stripe": float(os.getenv("PSP_BACKFILL_STRIPE_RPS", "25")),
+}
+REQUESTS_PER_TX = {
+    "paypal": 1,
+    "stripe": 2,
+}
+
+
+class TokenBucket:
+    """Thread-safe token bucket whose rate halves on throttling and creeps back on success."""
+
+    def __init__(self, rate: float, capacity: float | None = None, min_rate: float = 0.5):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self.min_rate = min(min_rate, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def throttle(self) -> None:
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0.0
+
+    def recover(self) -> None:
+        with self._lock:
+            self._refill()
+            self.rate = min(self.base_rate, self.rate + self.base_rate * 0.05)
+
+
+@dataclass(frozen=True)
+class BackfillTask:
+    payment_method: str
+    transaction_id: str
+    order_number: str
+    # When the order was placed; bounds the bulk listings. Not part of the task's identity.
+    ordered_at: datetime | None = field(default=None, compare=False)
+
+    @property
+    def provider(self) -> str:
+        return psp_cache.provider(self.payment_method)
+
+    @property
+    def args(self) -> tuple[str, str, str]:
+        return self.payment_method, self.transaction_id, self.order_number
+
+    @property
+    def limiter_key(self) -> str:
+        if self.provider == "stripe":
+            unit = business_units.match(self.order_number)
+            return f"stripe:{unit.stripe_key}" if unit else "stripe"
+        return self.provider
+
+
+class RateLimiters:
+    """One bucket per PayPal account and per Stripe secret key."""
+
+    def __init__(self):
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> TokenBucket:
+        with self._lock:
+            if key not in self._buckets:
+                provider = key.split(":", 1)[0]
+                self._buckets[key] = TokenBucket(PROVIDER_RPS.get(provider, 5.0))
+            return self._buckets[key]
+
+
+def pending_tasks(df: pd.DataFrame) -> list[BackfillTask]:
+    """Unique PSP lookups from an orders frame that are not cached yet."""
+    seen = set()
+    tasks = []
+    cols = ["Payment Method", "Payment Transaction ID", "Order Number"]
+    if "Purchased on" in df.columns:
+        dates = pd.to_datetime(df["Purchased on"], errors="coerce")
+    else:
+        dates = pd.Series(pd.NaT, index=df.index)
+    for (payment_method, transaction_id, order_number), ordered in zip(df[cols].itertuples(index=False), dates):
+        if pd.isna(payment_method) or pd.isna(transaction_id) or not payment_method or not transaction_id:
+            continue
+        task = BackfillTask(
+            str(payment_method),
+            str(transaction_id),
+            "" if pd.isna(order_number) else str(order_number),
+            None if pd.isna(ordered) else ordered.to_pydatetime(),
+        )
+        if task.provider not in PROVIDER_RPS:
+            continue
+        key = psp_cache.cache_key(*task.args)
+        if key in seen or psp_cache.contains(*task.args):
+            continue
+        seen.add(key)
+        tasks.append(task)
+    return tasks
+
+
+def _call_with_backoff(bucket: TokenBucket, cost: float, fn: Callable[[], T]) -> T:
+    """Run ``fn`` under the limiter, backing off and retrying on 429 / 5xx."""
+    for attempt in range(MAX_RETRIES + 1):
+        bucket.acquire(cost)
+        try:
+            result = fn()
+        except PSPHTTPError as e:
+            if not e.retryable or attempt == MAX_RETRIES:
+                raise
+            bucket.throttle()
+            time.sleep(e.retry_after or min(60.0, 2 ** attempt) * (0.5 + random.random()))
+            continue
+        bucket.recover()
+        return result
+
+
+def _run_task(task: BackfillTask, limiters: RateLimiters) -> bool:
+    """Fetch and cache one settlement. Returns False when it should be retried on a later run."""
+    bucket = limiters.get(task.limiter_key)
+    try:
+        data = _call_with_backoff(
+            bucket, REQUESTS_PER_TX.get(task.provider, 1), lambda: fetch_remote_psp_data(*task.args)
+        )
+    except PSPHTTPError as e:
+        if e.retryable:
+            logging.warning(f"{task.provider} {task.transaction_id}: giving up after {MAX_RETRIES} retries ({e.status})")
+            return False
+        if e.status != 404:
+            logging.error(f"{task.provider} {task.transaction_id}: {e}")
+            return False
+        # The PSP has no such transaction; cache the placeholder so it is not asked again.
+        _append_cache(*task.args, default_psp_data())
+        logging.error(f"{task.provider} {task.transaction_id}: {e}")
+        return True
+    except Exception as e:
+        # Timeouts, connection errors and unexpected payloads stay pending for the next run.
+        logging.warning(f"{task.provider} {task.transaction_id}: {type(e).__name__}: {e}")
+        return False
+    psp_data = default_psp_data()
+    psp_data.update(data)
+    _append_cache(*task.args, psp_data)
+    return True
+
+
+def _window(tasks: list[BackfillTask]) -> tuple[datetime, datetime] | None:
+    """UTC listing window around the tasks' order dates, or None when none is known."""
+    dates = [task.ordered_at for task in tasks if task.ordered_at is not None]
+    if not dates:
+        return None
+    # Pad the window: order timestamps are local, Stripe's are UTC.
+    start = (min(dates) - timedelta(days=1)).replace(tzinfo=timezone.utc)
+    end = (max(dates) + timedelta(days=2)).replace(tzinfo=timezone.utc)
+    return start, end
+
+
+def prefetch_stripe(tasks: list[BackfillTask], limiters: RateLimiters) -> list[BackfillTask]:
+    """
+    Settle Stripe tasks from paginated balance-transaction listings, one pass per
+    secret key over the window of that key's pending orders, and return the tasks
+    that still need a per-order lookup. Keys with few pending orders are left to them.
+    """
+    by_key: dict[str, list[BackfillTask]] = {}
+    for task in tasks:
+        if task.provider == "stripe" and task.limiter_key != "stripe":
+            by_key.setdefault(task.limiter_key, []).append(task)
+
+    settled: set[BackfillTask] = set()
+    for limiter_key, key_tasks in by_key.items():
+        key_name = limiter_key.split(":", 1)[1]
+        api_key = os.getenv(key_name)
+        window = _window(key_tasks)
+        if not api_key or window is None or len(key_tasks) < BULK_MIN_TASKS:
+            continue
+        start, end = window
+        bucket = limiters.get(limiter_key)
+
+        def list_page(*args):
+            return _call_with_backoff(bucket, 1, lambda: list_balance_transactions(*args))
+
+        try:
+            settlements = settlements_by_payment_intent(
+                tqdm(iter_balance_transactions(api_key, start, end, list_page), desc=key_name, unit="bt")
+            )
+        except PSPHTTPError as e:
+            logging.error(f"Bulk Stripe listing failed for {key_name}: {e}")
+            continue
+        key_settled = _cache_settled(
+            key_tasks, settlements, key=lambda task: strip_refund_suffix(task.transaction_id)
+        )
+        settled.update(key_settled)
+        logging.info(f"{key_name}: settled {len(key_settled)}/{len(key_tasks)} orders from {len(settlements)} charges")
+    return [task for task in tasks if task not in settled]
+
+
+def prefetch_paypal(tasks: list[BackfillTask], limiters: RateLimiters) -> list[BackfillTask]:
+    """
+    Settle PayPal tasks from the transaction search API over the window of the pending
+    orders; returns the tasks it could not match. Few pending orders are left to
+    per-order lookups.
+    """
+    paypal_tasks = [task for task in tasks if task.provider == "paypal"]
+    window = _window(paypal_tasks)
+    if window is None or len(paypal_tasks) < BULK_MIN_TASKS:
+        return tasks
+    start, end = window
+    bucket = limiters.get("paypal")
+
+    def list_page(*args):
+        return _call_with_backoff(bucket, 1, lambda: list_transactions(*args))
+
+    try:
+        settlements = settlements_by_transaction(
+            tqdm(iter_transactions(start, end, list_page), desc="paypal search", unit="tx")
+        )
+    except PSPHTTPError as e:
+        logging.error(f"Bulk PayPal search failed: {e}")
+        return tasks
+    settled = _cache_settled(paypal_tasks, settlements, key=lambda task: task.transaction_id)
+    logging.info(f"paypal: settled {len(settled)}/{len(paypal_tasks)} orders from {len(settlements)} transactions")
+    return [task for task in tasks if task not in settled]
+
+
+def _cache_settled(
+    tasks: list[BackfillTask], settlements: dict[str, dict], key: Callable[[BackfillTask], str]
+) -> set[BackfillTask]:
+    records = []
+    settled = set()
+    for task in tasks:
+        data = settlements.get(key(task))
+        if data is not None:
+            psp_data = default_psp_data()
+            psp_data.update(data)
+            records.append((*task.args, psp_data))
+            settled.add(task)
+    _append_cache_many(records)
+    return settled
+
+
+ORDER_COLUMNS = ["Payment Method", "Payment Transaction ID", "Order Number"]
+
+
+def _stored_orders() -> pd.DataFrame:
+    if columnar_store.has_order_details():
+        return columnar_store.read_order_details(columns=ORDER_COLUMNS)
+    return pd.read_csv(ORDER_DETAILS_CSV, usecols=ORDER_COLUMNS, dtype=str, keep_default_na=False)
+
+
+def reconcile_paypal(start: datetime, end: datetime, orders: pd.DataFrame | None = None) -> int:
+    """
+    Daily reconciliation: load the PayPal transactions in [start, end) that belong to a
+    known order into the PSP cache. A transaction matches an order by its transaction id,
+    or else by the invoice id PayPal recorded; ``orders`` defaults to the order store.
+    Transactions matching no order are skipped, since enrichment would turn them into
+    rows without order fields.
+    """
+    if orders is None:
+        orders = _stored_orders()
+    transactions = list(iter_transactions(start, end))
+    settlements = settlements_by_transaction(transactions)
+
+    rows = orders[ORDER_COLUMNS].dropna(subset=["Order Number"]).itertuples(index=False)
+    by_transaction, by_order = {}, {}
+    for payment_method, transaction_id, order_number in rows:
+        by_transaction[transaction_id] = (payment_method, order_number)
+        by_order.setdefault(order_number, (payment_method, order_number))
+    invoices = {info.get("transaction_id"): info.get("invoice_id") or "" for info in transactions}
+
+    records, unmatched = [], 0
+    for transaction_id, data in settlements.items():
+        attribution = by_transaction.get(transaction_id) or by_order.get(invoices.get(transaction_id))
+        if attribution is None:
+            unmatched += 1
+            continue
+        payment_method, order_number = attribution
+        psp_data = default_psp_data()
+        psp_data.update(data)
+        records.append((payment_method, transaction_id, order_number, psp_data))
+    _append_cache_many(records)
+    psp_cache.export_parquet()
+    logging.info(
+        f"Reconciled {len(records)} PayPal transactions between {start} and {end}; "
+        f"skipped {unmatched} with no matching order; connections={pool_stats()}"
+    )
+    return len(records)
+
+
+def run_backfill(df: pd.DataFrame, workers: int = WORKERS, bulk: bool = BULK) -> dict[str, int]:
+    """Fetch every uncached settlement in ``df`` concurrently. Safe to re-run after an interruption."""
+    tasks = pending_tasks(df)
+    limiters = RateLimiters()
+    if bulk and tasks:
+        tasks = prefetch_stripe(tasks, limiters)
+        tasks = prefetch_paypal(tasks, limiters)
+    by_provider: dict[str, list[BackfillTask]] = {}
+    for task in tasks:
+        by_provider.setdefault(task.provider, []).append(task)
+
+    # Interleave providers so neither one's limiter idles while the other drains.
+    ordered = []
+    queues = list(by_provider.values())
+    for i in range(max((len(q) for q in queues), default=0)):
+        ordered.extend(q[i] for q in queues if i < len(q))
+
+    bars = {
+        provider: tqdm(total=len(items), desc=provider, unit="tx", position=pos)
+        for pos, (provider, items) in enumerate(by_provider.items())
+    }
+    failed = {provider: 0 for provider in by_provider}
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_run_task, task, limiters): task for task in ordered}
+            for future in as_completed(futures):
+                task = futures[future]
+                if not future.result():
+                    failed[task.provider] += 1
+                bars[task.provider].update(1)
+    finally:
+        for bar in bars.values():
+            bar.close()
+
+    psp_cache.export_parquet()
+    summary = {provider: len(items) - failed[provider] for provider, items in by_provider.items()}
+    logging.info(f"Backfill done: cached={summary}, deferred={failed}, connections={pool_stats()}")
+    return summary
+
+
+def main():
+    with pooled_connection() as conn:
+        rows, columns = list_tables(conn, DEFAULT_QUERY)
+    print(len(rows))
+    df = pd.DataFrame(rows, columns=columns if columns else None)
+    run_backfill(df)
+    print("PSP data cached successfully")
+
+
+def _utc_date(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill PSP settlements for the extracted orders.")
+    parser.add_argument(
+        "--reconcile-paypal",
+        nargs=2,
+        metavar=("START", "END"),
+        type=_utc_date,
+        help="Instead, load PayPal transactions in [START, END) (YYYY-MM-DD, UTC) for known orders.",
+    )
+    args = parser.parse_args()
+    if args.reconcile_paypal:
+        reconcile_paypal(*args.reconcile_paypal)
+    else:
+        main()
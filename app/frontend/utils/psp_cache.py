@@ -0,0 +1,193 @@
+import csv
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+
+from app.backend.paths import DATA_DIR
+from app.frontend.utils.columnar_store import write_psp_data
+
+
+CACHE_HEADERS = [
+    "payment_method",
+    "transaction_id",
+    "order_number",
+    "gross_amount",
+    "psp_fees",
+    "settlement_amount",
+    "currency_code",
+    "conversion_rate",
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS psp_settlements (
+    provider TEXT NOT NULL,
+    transaction_id TEXT NOT NULL,
+    order_key TEXT NOT NULL,
+    payment_method TEXT NOT NULL,
+    order_number TEXT NOT NULL,
+    gross_amount REAL,
+    psp_fees REAL,
+    settlement_amount REAL,
+    currency_code TEXT,
+    conversion_rate REAL,
+    PRIMARY KEY (provider, transaction_id, order_key)
+)
+"""
+
+_lock = threading.RLock()
+_conn: sqlite3.Connection | None = None
+
+
+def db_path() -> Path:
+    return DATA_DIR / "psp_data.db"
+
+
+def csv_path() -> Path:
+    return DATA_DIR / "psp_data.csv"
+
+
+def provider(payment_method: str) -> str:
+    """Normalise a payment method (``paypal_express``, ``stripe_payments`` ...) to its PSP."""
+    pm = (payment_method or "").lower()
+    if "paypal" in pm:
+        return "paypal"
+    if "stripe" in pm:
+        return "stripe"
+    return pm
+
+
+def cache_key(payment_method: str, transaction_id: str, order_number: str | None) -> tuple[str, str, str]:
+    """PayPal captures are unique on their own, Stripe intents are scoped to the order."""
+    prov = provider(payment_method)
+    order_key = (order_number or "") if prov == "stripe" else ""
+    return prov, transaction_id, order_key
+
+
+def _connection() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        path = db_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fresh = not path.exists()
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(_SCHEMA)
+        conn.commit()
+        _conn = conn
+        if fresh:
+            migrate_csv()
+    return _conn
+
+
+def _row_to_data(row: tuple) -> dict:
+    gross, fees, settlement, currency, rate = row
+    return {
+        "gross_amount": float(gross or 0.0),
+        "psp_fees": float(fees or 0.0),
+        "settlement_amount": float(settlement or 0.0),
+        "currency_code": currency or None,
+        "conversion_rate": float(rate or 1.0),
+    }
+
+
+def _record(payment_method: str, transaction_id: str, order_number: str | None, data: dict) -> tuple:
+    return (
+        *cache_key(payment_method, transaction_id, order_number),
+        (payment_method or "").lower(),
+        order_number or "",
+        float(data.get("gross_amount") or 0.0),
+        float(data.get("psp_fees") or 0.0),
+        float(data.get("settlement_amount") or 0.0),
+        data.get("currency_code"),
+        float(data.get("conversion_rate") or 1.0),
+    )
+
+
+def get(payment_method: str, transaction_id: str, order_number: str | None) -> dict | None:
+    """Cached settlement for a transaction, or None."""
+    with _lock:
+        row = _connection().execute(
+            "SELECT gross_amount, psp_fees, settlement_amount, currency_code, conversion_rate "
+            "FROM psp_settlements WHERE provider = ? AND transaction_id = ? AND order_key = ?",
+            cache_key(payment_method, transaction_id, order_number),
+        ).fetchone()
+    return _row_to_data(row) if row is not None else None
+
+
+def contains(payment_method: str, transaction_id: str, order_number: str | None) -> bool:
+    with _lock:
+        row = _connection().execute(
+            "SELECT 1 FROM psp_settlements WHERE provider = ? AND transaction_id = ? AND order_key = ?",
+            cache_key(payment_method, transaction_id, order_number),
+        ).fetchone()
+    return row is not None
+
+
+def put_many(records: list[tuple[str, str, str | None, dict]]) -> int:
+    """Upsert ``(payment_method, transaction_id, order_number, data)`` records in one transaction."""
+    rows = [_record(*r) for r in records]
+    if not rows:
+        return 0
+    with _lock:
+        conn = _connection()
+        conn.executemany(
+            "INSERT OR REPLACE INTO psp_settlements VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+    return len(rows)
+
+
+def put(payment_method: str, transaction_id: str, order_number: str | None, data: dict) -> None:
+    put_many([(payment_method, transaction_id, order_number, data)])
+
+
+def count() -> int:
+    with _lock:
+        return _connection().execute("SELECT COUNT(*) FROM psp_settlements").fetchone()[0]
+
+
+def migrate_csv(path: Path | None = None) -> int:
+    """One-shot import of the legacy CSV cache. Later rows win, as they would have on re-fetch."""
+    path = path or csv_path()
+    if not path.exists():
+        return 0
+    with path.open("r", newline="") as f:
+        records = [
+            (
+                row.get("payment_method", ""),
+                row.get("transaction_id", ""),
+                row.get("order_number", ""),
+                {
+                    "gross_amount": row.get("gross_amount"),
+                    "psp_fees": row.get("psp_fees"),
+                    "settlement_amount": row.get("settlement_amount"),
+                    "currency_code": row.get("currency_code") or None,
+                    "conversion_rate": row.get("conversion_rate"),
+                },
+            )
+            for row in csv.DictReader(f)
+            if row.get("transaction_id")
+        ]
+    imported = put_many(records)
+    logging.info(f"Imported {imported} PSP rows from {path}")
+    return imported
+
+
+def export_parquet() -> int:
+    """Snapshot the store to the typed Parquet copy read by the dashboard."""
+    with _lock:
+        rows = _connection().execute(
+            "SELECT payment_method, transaction_id, order_number, gross_amount, psp_fees, "
+            "settlement_amount, currency_code, conversion_rate FROM psp_settlements"
+        ).fetchall()
+    write_psp_data(rows)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    migrate_csv()
+    print(f"{count()} PSP settlements in {db_path()}")
+    print(f"Exported {export_parquet()} rows to Parquet")
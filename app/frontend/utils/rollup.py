@@ -0,0 +1,218 @@
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from app.backend import business_units
+
+
+DIMENSIONS = ["date", "Vendor Name", "bucket", "Payment Method", "currency_code"]
+MEASURES = [
+    "gross_amount",
+    "settlement_amount",
+    "psp_fees",
+    "Vendor Amount",
+    "Vendor Subtotal",
+    "Vendor Shipping",
+    "margin_profit",
+    "Total Purchased",
+    "Subtotal Purchased",
+    "Tax",
+    "Shipping",
+]
+
+# HyperLogLog precision: 2**14 registers, ~0.8% error on large counts and near-exact
+# (linear counting) below ~40k orders. Registers are stored sparsely, as packed
+# ``cell | register | rank`` integers, so a cell only costs the registers it touched.
+SKETCH_P = 14
+SKETCH_M = 1 << SKETCH_P
+_RANK_BITS = 6
+_CELL_SHIFT = SKETCH_P + _RANK_BITS
+# Dimensions whose slices keep exact distinct-order counts (see Rollup.group_orders).
+EXACT_GROUP = ["Vendor Name", "currency_code"]
+_ORDER_BITS = 32
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _hash_keys(keys: pd.Series) -> np.ndarray:
+    """64-bit hashes of string keys, folding fixed-width byte words through splitmix64."""
+    try:
+        raw = keys.astype(str).to_numpy().astype("S")
+    except UnicodeEncodeError:
+        return pd.util.hash_pandas_object(keys.astype(str), index=False).to_numpy(np.uint64)
+    width = -(-max(raw.dtype.itemsize, 1) // 8) * 8
+    padded = np.zeros(len(raw), dtype=f"S{width}")
+    padded[:] = raw
+    hashes = np.full(len(raw), width, dtype=np.uint64)
+    for word in padded.view(np.uint64).reshape(len(raw), -1).T:
+        hashes = _mix(hashes ^ word)
+    return hashes
+
+
+def _leading_zeros(v: np.ndarray) -> np.ndarray:
+    zeros = np.zeros(len(v), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        empty_top = v < np.uint64(1 << (64 - shift))
+        zeros += shift * empty_top
+        v = np.where(empty_top, v << np.uint64(shift), v)
+    return zeros + (v == 0)
+
+
+def _sketch(cell: np.ndarray, keys: pd.Series) -> np.ndarray:
+    """Sorted sparse HyperLogLog registers of ``keys`` per cell, highest rank only."""
+    present = keys.notna().to_numpy()
+    hashes = _hash_keys(keys[present])
+    slot = (hashes >> np.uint64(64 - SKETCH_P)).astype(np.int64)
+    rank = np.minimum(_leading_zeros(hashes << np.uint64(SKETCH_P)) + 1, 64 - SKETCH_P + 1)
+    packed = (cell[present].astype(np.int64) << _CELL_SHIFT) | (slot << _RANK_BITS) | rank
+    packed.sort()
+    register = packed >> _RANK_BITS
+    return packed[np.r_[register[1:] != register[:-1], True]]
+
+
+def _registers(sketches: np.ndarray, group: np.ndarray, n_groups: int) -> np.ndarray:
+    """Dense registers per group, merging the sparse registers of each group's cells."""
+    registers = np.zeros((n_groups, SKETCH_M), dtype=np.uint8)
+    slot = (sketches >> _RANK_BITS) & (SKETCH_M - 1)
+    rank = (sketches & ((1 << _RANK_BITS) - 1)).astype(np.uint8)
+    np.maximum.at(registers, (group[sketches >> _CELL_SHIFT], slot), rank)
+    return registers
+
+
+def _estimate(registers: np.ndarray) -> np.ndarray:
+    m = SKETCH_M
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.power(2.0, -registers.astype(np.float64)).sum(axis=1)
+    zeros = (registers == 0).sum(axis=1)
+    small = (raw <= 2.5 * m) & (zeros > 0)
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.rint(np.where(small, linear, raw)).astype(np.int64)
+
+
+@dataclass(frozen=True)
+class Rollup:
+    """
+    Daily cube of the enriched orders. ``cells`` holds one row per dimension combination
+    with additive measures and a row count; ``sketches`` holds the cells' sparse
+    distinct-order registers, so order counts can be merged across any slice.
+
+    ``group_orders`` also keeps the exact distinct orders of each (vendor, currency)
+    group, packed as ``group << 32 | order``, with ``cell_groups`` giving each cell's
+    group. Slices that keep or drop whole groups (vendor selections, refunded or not)
+    keep exact counts; any other slice sets it to None and counts from the sketches.
+    """
+
+    cells: pd.DataFrame
+    sketches: np.ndarray
+    cell_groups: np.ndarray | None = None
+    group_orders: np.ndarray | None = None
+
+    @property
+    def empty(self) -> bool:
+        return self.cells.empty
+
+    def where(self, mask: pd.Series | np.ndarray) -> "Rollup":
+        mask = np.asarray(mask, dtype=bool)
+        if mask.all():
+            return self
+        cell = self.sketches >> _CELL_SHIFT
+        kept = mask[cell]
+        renumbered = np.cumsum(mask) - 1
+        sketches = (renumbered[cell[kept]] << _CELL_SHIFT) | (self.sketches[kept] & ((1 << _CELL_SHIFT) - 1))
+        return Rollup(
+            self.cells[mask].reset_index(drop=True),
+            sketches,
+            self.cell_groups[mask] if self.cell_groups is not None else None,
+            self._kept_group_orders(mask),
+        )
+
+    def _kept_group_orders(self, mask: np.ndarray) -> np.ndarray | None:
+        """``group_orders`` of the groups ``mask`` keeps, or None if it splits a group."""
+        if self.group_orders is None or self.cell_groups is None:
+            return None
+        order_group = self.group_orders >> _ORDER_BITS
+        n_groups = int(max(self.cell_groups.max(initial=-1), order_group.max(initial=-1))) + 1
+        cells = np.bincount(self.cell_groups, minlength=n_groups)
+        kept = np.bincount(self.cell_groups[mask], minlength=n_groups)
+        if not ((kept == 0) | (kept == cells)).all():
+            return None
+        return self.group_orders[kept[order_group] > 0]
+
+    def slice(
+        self,
+        vendors: list[str] | None = None,
+        start: date | None = None,
+        end: date | None = None,
+        months: list[int] | None = None,
+    ) -> "Rollup":
+        mask = pd.Series(True, index=self.cells.index)
+        if vendors is not None:
+            mask &= self.cells["Vendor Name"].isin(vendors)
+        if start is not None:
+            mask &= self.cells["date"] >= pd.Timestamp(start)
+        if end is not None:
+            mask &= self.cells["date"] <= pd.Timestamp(end)
+        if months is not None:
+            mask &= self.cells["date"].dt.month.isin(months)
+        return self.where(mask)
+
+    def totals(self, by: str | list[str] | None = None) -> pd.DataFrame:
+        """Measures summed over ``by``, plus ``refunded_rows`` and ``refunded_amount``."""
+        cells = self.cells.assign(
+            refunded_rows=self.cells["rows"].where(self.cells["is_refunded"], 0),
+            refunded_amount=self.cells["Total Purchased"].where(self.cells["is_refunded"], 0.0),
+        )
+        measures = [*MEASURES, "rows", "refunded_rows", "refunded_amount"]
+        if by is None:
+            return cells[measures].sum().to_frame().T.astype(cells[measures].dtypes)
+        return cells.groupby(by, dropna=False, observed=True)[measures].sum().reset_index()
+
+    def distinct_orders(self, by: str | list[str] | None = None) -> int | pd.Series:
+        """
+        Number of distinct order numbers, overall or per group of ``by``. Exact overall
+        while ``group_orders`` is kept, otherwise estimated by merging the cells' sketches.
+        """
+        if by is None:
+            if self.empty:
+                return 0
+            if self.group_orders is not None:
+                return len(np.unique(self.group_orders & ((1 << _ORDER_BITS) - 1)))
+            return int(_estimate(_registers(self.sketches, np.zeros(len(self.cells), dtype=np.int64), 1))[0])
+        grouped = self.cells.groupby(by, dropna=False, observed=True)
+        registers = _registers(self.sketches, grouped.ngroup().to_numpy(), grouped.ngroups)
+        return pd.Series(_estimate(registers), index=grouped.size().index, name="orders")
+
+
+def build_rollup(df: pd.DataFrame) -> Rollup:
+    """Aggregate the row-level enriched frame into a :class:`Rollup`."""
+    keys = pd.DataFrame({
+        "date": pd.to_datetime(df["Purchased on"]).dt.normalize(),
+        "Vendor Name": df["Vendor Name"],
+        "bucket": business_units.classify(df["Order Number"]),
+        "Payment Method": df["Payment Method"],
+        "currency_code": df["currency_code"],
+    })
+    values = pd.DataFrame({
+        # float64 accumulators, whatever the row-level layout stores.
+        col: pd.to_numeric(df[col], errors="coerce").astype("float64") if col in df.columns else 0.0
+        for col in MEASURES
+    }, index=df.index)
+    values["rows"] = 1
+
+    grouped = values.groupby([keys[c] for c in DIMENSIONS], dropna=False, sort=True, observed=True)
+    cells = grouped.sum().reset_index()
+    cells["is_refunded"] = cells["currency_code"].astype(str).str.lower().eq("refunded")
+    cell = grouped.ngroup().to_numpy()
+    sketches = _sketch(cell, df["Order Number"])
+
+    cell_groups = cells.groupby(EXACT_GROUP, dropna=False, sort=False, observed=True).ngroup().to_numpy()
+    order, _ = pd.factorize(df["Order Number"])
+    present = order >= 0
+    group_orders = np.unique((cell_groups[cell[present]].astype(np.int64) << _ORDER_BITS) | order[present])
+    return Rollup(cells, sketches, cell_groups, group_orders)
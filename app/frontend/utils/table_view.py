@@ -0,0 +1,90 @@
+import gzip
+import io
+import threading
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import streamlit as st
+
+
+SEARCH_COLUMN = "Order Number"
+EXPORT_CHUNK_ROWS = 50_000
+RATE_COLUMNS = {"conversion_rate"}
+
+
+def number_columns(df: pd.DataFrame) -> dict:
+    """
+    ``st.dataframe`` column config for the float columns of ``df``. Amounts are float32
+    in memory; this shows them to the cent rather than as 988.549988.
+    """
+    return {
+        c: st.column_config.NumberColumn(format="%.6f" if c in RATE_COLUMNS else "%.2f")
+        for c in df.columns if pd.api.types.is_float_dtype(df[c])
+    }
+
+
+class TableIndex:
+    """
+    Sort orders and a search key over a shared, read-only frame. Each sort order is
+    computed once on first use and then reused by every session, so a page request
+    only costs a mask and a slice.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._orders: dict[tuple[str, bool], np.ndarray] = {}
+        self._lock = threading.Lock()
+        self._search_key: pa.Array | None = None
+
+    def order(self, column: str, ascending: bool = True) -> np.ndarray:
+        """Row positions sorted by ``column``, nulls last."""
+        key = (column, ascending)
+        with self._lock:
+            if key not in self._orders:
+                values = self.df[column].reset_index(drop=True)
+                self._orders[key] = values.sort_values(
+                    ascending=ascending, kind="stable", na_position="last"
+                ).index.to_numpy()
+            return self._orders[key]
+
+    def _search(self) -> pa.Array:
+        with self._lock:
+            if self._search_key is None:
+                values = self.df[SEARCH_COLUMN].to_numpy(dtype=object)
+                self._search_key = pc.utf8_upper(pa.array(values, pa.string(), from_pandas=True))
+            return self._search_key
+
+    def matches(self, term: str) -> np.ndarray:
+        """Boolean mask of rows whose order number contains ``term``, ignoring case."""
+        hits = pc.match_substring(self._search(), term.strip().upper())
+        return pc.fill_null(hits, False).to_numpy(zero_copy_only=False)
+
+    def select(
+        self, mask: np.ndarray | None, sort_by: str | None = None, ascending: bool = True
+    ) -> np.ndarray:
+        """Positions of the rows in ``mask``, in display order."""
+        if sort_by is None:
+            return np.arange(len(self.df)) if mask is None else np.flatnonzero(mask)
+        order = self.order(sort_by, ascending)
+        return order if mask is None else order[mask[order]]
+
+    def page(self, positions: np.ndarray, page: int, page_size: int) -> pd.DataFrame:
+        """Only the rows of one page are copied out of the shared frame."""
+        start = page * page_size
+        return self.df.iloc[positions[start:start + page_size]]
+
+    def iter_csv(self, positions: np.ndarray, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+        """CSV of the selected rows, encoded a chunk at a time."""
+        for start in range(0, max(len(positions), 1), chunk_rows):
+            chunk = self.df.iloc[positions[start:start + chunk_rows]]
+            yield chunk.to_csv(index=False, header=start == 0).encode("utf-8")
+
+    def export_csv_gz(self, positions: np.ndarray) -> bytes:
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode="wb") as gz:
+            for chunk in self.iter_csv(positions):
+                gz.write(chunk)
+        return buffer.getvalue()
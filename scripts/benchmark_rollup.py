@@ -0,0 +1,66 @@
+import argparse
+import os, sys
+import time
+
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.backend.business_units import CODES, classify
+from app.frontend.utils.rollup import build_rollup
+
+VENDORS = ["AllPoints", "Encompass", "Metropac", "Neuco", "ReliableParts"]
+PAYMENT_METHODS = ["stripe_payments", "paypal_express"]
+
+
+def synthetic_orders(n: int, seed: int = 0) -> pd.DataFrame:
+    """An enriched-orders-shaped frame with ``n`` rows over roughly a year."""
+    rng = np.random.default_rng(seed)
+    prefixes = np.array([*CODES, "XX"])
+    order_numbers = pd.Series(prefixes[rng.integers(0, len(prefixes), n)]).str.cat(
+        pd.Series(rng.permutation(n)).astype(str).str.zfill(9)
+    )
+    amounts = rng.gamma(2.0, 90.0, n).round(2)
+    return pd.DataFrame({
+        "Order Number": order_numbers,
+        "Purchased on": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365 * 86400, n), unit="s"),
+        "Vendor Name": np.array(VENDORS)[rng.integers(0, len(VENDORS), n)],
+        "Payment Method": np.array(PAYMENT_METHODS)[rng.integers(0, len(PAYMENT_METHODS), n)],
+        "currency_code": np.where(rng.random(n) < 0.08, "Refunded", "USD"),
+        "gross_amount": amounts,
+        "settlement_amount": amounts * 0.965,
+        "psp_fees": amounts * 0.035,
+        "Vendor Amount": amounts * 0.7,
+        "Vendor Subtotal": amounts * 0.65,
+        "Vendor Shipping": amounts * 0.05,
+        "margin_profit": amounts * 0.265,
+        "Total Purchased": amounts,
+        "Subtotal Purchased": amounts * 0.9,
+        "Tax": amounts * 0.05,
+        "Shipping": amounts * 0.05,
+    })
+
+
+def _timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time bucket assignment and the rollup build at increasing sizes.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 500_000, 1_000_000, 2_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'buckets s':>10} {'rollup s':>10} {'by-bucket s':>12} {'ns/row':>8}")
+    for n in args.sizes:
+        df = synthetic_orders(n)
+        buckets = _timed(classify, df["Order Number"])
+        start = time.perf_counter()
+        rollup = build_rollup(df)
+        built = time.perf_counter() - start
+        by_bucket = _timed(rollup.totals, "bucket")
+        print(f"{n:>10} {buckets:>10.3f} {built:>10.3f} {by_bucket:>12.4f} {built / n * 1e9:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,188 @@
 import os,sys
+import json
+import time
+from datetime import datetime, timedelta
 import pandas as pd
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from app.backend.db_connection import create_connection, list_tables
-from app.frontend.queries.orders import DEFAULT_QUERY
+from app.backend.db_connection import iter_batches, pooled_connection
+from app.backend.paths import data_path
+from app.frontend.queries.orders import DEFAULT_QUERY, INCREMENTAL_QUERY
+from app.frontend.utils import columnar_store
+from app.frontend.utils.columnar_store import write_order_details, write_order_details_from_csv
+
+OUTPUT_PATH = data_path("order_details.csv")
+WATERMARK_PATH = data_path("order_details.watermark.json")
+# Re-pull this far behind the watermark so refunds and status changes on recent orders are picked up.
+LOOKBACK_DAYS = int(os.getenv("ORDER_EXTRACT_LOOKBACK_DAYS", "14"))
+KEY = "Order Number"
+
+
+def read_watermark() -> dict | None:
+    if not os.path.exists(WATERMARK_PATH):
+        return None
+    with open(WATERMARK_PATH) as f:
+        return json.load(f)
+
+
+def write_watermark(last_ordered, stats: dict, changed: bool = True) -> None:
+    """Record the extraction; ``data_version`` only moves when the stored orders changed."""
+    previous = read_watermark() or {}
+    last_ordered = pd.to_datetime(last_ordered)
+    watermark = {
+        "last_ordered_date": last_ordered.isoformat() if pd.notna(last_ordered) else None,
+        "data_version": previous.get("data_version", 0) + (1 if changed else 0),
+        "extracted_at": datetime.now().isoformat(timespec="seconds"),
+        **stats,
+    }
+    with open(WATERMARK_PATH, "w") as f:
+        json.dump(watermark, f, indent=2)
+
+
+def _iter_frames(query: str, params: dict | None = None):
+    """Stream the query as DataFrame chunks of DB_FETCH_BATCH_SIZE rows."""
+    with pooled_connection() as conn:
+        for rows, columns in iter_batches(conn, query, params):
+            yield pd.DataFrame(rows, columns=columns)
+
+
+def _fetch(query: str, params: dict | None = None) -> pd.DataFrame:
+    frames = list(_iter_frames(query, params))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def stream_to_csv(query: str, output_path: str | os.PathLike, params: dict | None = None) -> tuple[int, object]:
+    """
+    Write the query result to ``output_path`` batch by batch, so memory stays bounded by
+    the batch size. Returns the row count and the latest 'Purchased on'.
+    """
+    tmp_path = f"{output_path}.tmp"
+    rows, last_ordered = 0, None
+    try:
+        for chunk in _iter_frames(query, params):
+            chunk.to_csv(tmp_path, mode="w" if rows == 0 else "a", header=rows == 0, index=False)
+            rows += len(chunk)
+            chunk_max = pd.to_datetime(chunk["Purchased on"]).max()
+            if last_ordered is None or chunk_max > last_ordered:
+                last_ordered = chunk_max
+        if rows:
+            os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return rows, last_ordered
+
+
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Coerce fetched rows to the store's layout (ms timestamps, floats, strings)."""
+    return columnar_store.order_details_table(df).to_pandas()
+
+
+def _comparable(df: pd.DataFrame) -> pd.DataFrame:
+    # Nulls as None so they compare equal inside row tuples (NaN != NaN).
+    return df.astype(object).where(df.notna(), None)
+
+
+def upsert_orders(existing: pd.DataFrame, fetched: pd.DataFrame) -> tuple[pd.DataFrame, int, int]:
+    """
+    Replace every order present in ``fetched`` (all of its vendor rows) and append new
+    ones. Both frames must be typed like the store, so values compare as parsed
+    timestamps and numbers rather than as formatted text. Returns the merged frame and
+    the number of orders added and updated.
+    """
+    existing = existing.reindex(columns=fetched.columns)
+
+    new_keys = set(fetched[KEY])
+    old_keys = set(existing[KEY])
+    touched = existing[existing[KEY].isin(new_keys)]
+
+    def rows_by_order(df: pd.DataFrame) -> dict[str, frozenset]:
+        return {k: frozenset(map(tuple, g.to_numpy())) for k, g in _comparable(df).groupby(KEY)}
+
+    before, after = rows_by_order(touched), rows_by_order(fetched[fetched[KEY].isin(old_keys)])
+    updated = sum(1 for k, rows in after.items() if before.get(k) != rows)
+    added = len(new_keys - old_keys)
+
+    merged = pd.concat([existing[~existing[KEY].isin(new_keys)], fetched], ignore_index=True)
+    merged = merged.sort_values("Purchased on", ascending=False, kind="stable")
+    return merged, added, updated
+
+
 def create_order_details_csv():
     """
     Fetches order details and saves them to a CSV file.
     """
     print("Fetching order details...")
-    conn = create_connection()
-    rows, columns = list_tables(conn, DEFAULT_QUERY)
-    df = pd.DataFrame(rows, columns=columns if columns else None)
-    
-
-    if df is not None and not df.empty:
-        output_path = "app/data/order_details.csv"
-        print(f"Saving order details to {output_path}...")
-        df.to_csv(output_path, index=False)
-        print("Done.")
+    started = time.perf_counter()
+    rows, last_ordered = stream_to_csv(DEFAULT_QUERY, OUTPUT_PATH)
+
+    if rows:
+        write_order_details_from_csv(OUTPUT_PATH)
+        stats = {"mode": "full", "rows": rows, "seconds": round(time.perf_counter() - started, 2)}
+        write_watermark(last_ordered, stats)
+        print(f"Saved {rows} orders to {OUTPUT_PATH}. {stats}")
     else:
         print("No data returned from get_order_details.")
 
+
+def update_order_details_csv() -> dict | None:
+    """
+    Incrementally refresh the month-partitioned store from the last extracted OrderedDate.
+    The store is the system of record here: only the months holding fetched orders are
+    read and rewritten, so a run costs O(delta), not O(history). The CSV stays the output
+    of the last full extraction (readers prefer the store once it is newer).
+    Falls back to a full extraction when there is no watermark or store yet.
+    """
+    watermark = read_watermark()
+    if not watermark or not watermark.get("last_ordered_date"):
+        create_order_details_csv()
+        return read_watermark()
+    if not columnar_store.has_order_details():
+        if not os.path.exists(OUTPUT_PATH):
+            create_order_details_csv()
+            return read_watermark()
+        write_order_details_from_csv(OUTPUT_PATH)
+
+    started = time.perf_counter()
+    last_ordered = pd.Timestamp(watermark["last_ordered_date"])
+    since = last_ordered.to_pydatetime() - timedelta(days=LOOKBACK_DAYS)
+    print(f"Fetching orders placed or closed since {since:%Y-%m-%d %H:%M:%S}...")
+    fetched = _fetch(INCREMENTAL_QUERY, {"since": since})
+    fetch_secs = time.perf_counter() - started
+
+    added = updated = 0
+    months: list[str] = []
+    if not fetched.empty:
+        new_columns = set(fetched.columns) - set(columnar_store.order_details_columns())
+        if new_columns:
+            # The query gained columns the stored months lack; rebuild them all at once.
+            print(f"Stored orders lack {sorted(new_columns)}; running a full extraction.")
+            create_order_details_csv()
+            return read_watermark()
+        fetched = _typed(fetched)
+        months = sorted(set(fetched["Purchased on"].dt.strftime("%Y-%m")))
+        existing = columnar_store.read_order_details(columns=list(fetched.columns), months=months)
+        merged, added, updated = upsert_orders(existing, fetched)
+        if added or updated:
+            # Whole months, so write_order_details replaces exactly these partitions.
+            write_order_details(merged)
+        last_ordered = max(last_ordered, fetched["Purchased on"].max())
+
+    stats = {
+        "mode": "incremental",
+        "fetched": len(fetched),
+        "months": months,
+        "added": added,
+        "updated": updated,
+        "fetch_seconds": round(fetch_secs, 2),
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    write_watermark(last_ordered, stats, changed=bool(added or updated))
+    print(f"Done. {stats}")
+    return stats
+
+
 if __name__ == "__main__":
-    create_order_details_csv()
+    if "--full" in sys.argv:
+        create_order_details_csv()
+    else:
+        update_order_details_csv()
@@ -1,11 +1,67 @@
-from locale import D_FMT
+import os,sys
+from datetime import date
+from pathlib import Path
 import pandas as pd
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.backend.paths import data_path
+from app.frontend.utils import columnar_store
 
+ORDER_DETAILS_CSV = data_path("order_details.csv")
+PSP_DATA_CSV = data_path("psp_data.csv")
+ENRICHED_CSV = data_path("order_details_with_psp.csv")
+# PSP order_number each enriched row came from; the unit of incremental rebuilds.
+ENRICHED_KEY = "_order_key"
 
-def get_order_details():
-    order_details_df = pd.read_csv("app/data/order_details.csv")
-    psp_df = pd.read_csv("app/data/psp_data.csv")
+# In-memory layout of the enriched dataset: low-cardinality text as categoricals, order
+# numbers as Arrow strings and amounts as float32 (exact to the cent below ~$130k).
+# Aggregations upcast to float64 before summing.
+ENRICHED_CATEGORIES = ["Vendor Name", "Payment Method", "payment_method", "currency_code"]
+ENRICHED_AMOUNTS = [
+    "Total Purchased", "Subtotal Purchased", "Tax", "Shipping", "Discount",
+    "Vendor Amount", "Vendor Subtotal", "Vendor Shipping",
+    "gross_amount", "psp_fees", "settlement_amount", "conversion_rate", "margin_profit",
+]
 
+
+def load_sources(
+    start: date | None = None, end: date | None = None, columns: list[str] | None = None
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Orders and PSP rows, from the typed Parquet store when it is at least as new as the
+    CSVs. ``start``/``end`` are pushed down to the store; ``columns`` projects the orders.
+    """
+    if columns is not None:
+        columns = list(dict.fromkeys(["Order Number", "Purchased on", *columns]))
+    if columnar_store.is_fresh(columnar_store.order_details_dir(), ORDER_DETAILS_CSV):
+        order_details_df = columnar_store.read_order_details(columns=columns, start=start, end=end)
+    else:
+        order_details_df = pd.read_csv(ORDER_DETAILS_CSV, usecols=columns, parse_dates=["Purchased on"])
+        if start is not None:
+            order_details_df = order_details_df[order_details_df["Purchased on"].dt.date >= start]
+        if end is not None:
+            order_details_df = order_details_df[order_details_df["Purchased on"].dt.date <= end]
+
+    filtered = start is not None or end is not None
+    order_numbers = order_details_df["Order Number"].dropna().unique() if filtered else None
+    if columnar_store.is_fresh(columnar_store.psp_data_path(), PSP_DATA_CSV):
+        psp_df = columnar_store.read_psp_data(order_numbers=order_numbers)
+    else:
+        psp_df = pd.read_csv(PSP_DATA_CSV)
+        if filtered:
+            psp_df = psp_df[psp_df["order_number"].isin(order_numbers)]
+    return order_details_df, psp_df
+
+
+def get_order_details(start: date | None = None, end: date | None = None, columns: list[str] | None = None):
+    order_details_df, psp_df = load_sources(start, end, columns)
+    return enrich(order_details_df, psp_df)
+
+
+def enrich(order_details_df: pd.DataFrame, psp_df: pd.DataFrame, keep_key: bool = False) -> pd.DataFrame:
+    """
+    Join orders onto their PSP rows and derive amounts and margin. Every step after the
+    join is row-local, so enriching a subset of orders equals slicing a full rebuild.
+    """
     df = pd.merge(
         order_details_df,
         psp_df,
@@ -31,6 +87,8 @@ def get_order_details():
                 df[col] = df[col].where(df[col].notna(), df[psp_col])
 
     df.loc[df['transaction_id'].str.endswith('-refund'), 'currency_code'] = 'Refunded'
+    if keep_key:
+        df[ENRICHED_KEY] = df["order_number"].astype(str)
 
     drop_cols = [
         "Payment Transaction ID",
@@ -72,10 +130,99 @@ def get_order_details():
     
     return df
 
+def _fingerprints(order_details_df: pd.DataFrame, psp_df: pd.DataFrame) -> pd.Series:
+    """One hash per PSP order_number covering its PSP rows and its order rows."""
+    def per_order(df: pd.DataFrame, key: str) -> pd.Series:
+        hashes = pd.util.hash_pandas_object(df, index=False)
+        return hashes.groupby(df[key].to_numpy()).sum()
+
+    psp_fp = per_order(psp_df, "order_number")
+    order_fp = per_order(order_details_df, "Order Number").reindex(psp_fp.index, fill_value=0)
+    return pd.Series(
+        psp_fp.to_numpy(dtype="uint64") ^ (order_fp.to_numpy(dtype="uint64") * 0x9E3779B97F4A7C15),
+        index=psp_fp.index.astype(str),
+        name="fingerprint",
+    )
+
+
+def _sorted(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values(["Purchased on", ENRICHED_KEY], ascending=[False, True], kind="stable").reset_index(drop=True)
+
+
+def build_enriched_orders(full: bool = False) -> tuple[pd.DataFrame, dict]:
+    """
+    Refresh the persisted enriched table, re-enriching only orders whose order or PSP
+    rows changed since the last build. Returns the table and what was rebuilt.
+    """
+    order_details_df, psp_df = load_sources()
+    fingerprints = _fingerprints(order_details_df, psp_df)
+    enriched_path = columnar_store.enriched_path()
+    fp_path = columnar_store.enriched_fingerprints_path()
+
+    if full or not enriched_path.exists() or not fp_path.exists():
+        df = _sorted(enrich(order_details_df, psp_df, keep_key=True))
+        stats = {"mode": "full", "orders": len(fingerprints), "rebuilt": len(fingerprints), "removed": 0}
+    else:
+        previous = pd.read_parquet(fp_path)["fingerprint"]
+        known = fingerprints.reindex(previous.index)
+        changed = fingerprints.index.difference(previous.index).union(previous.index[known.ne(previous).to_numpy()])
+        removed = previous.index.difference(fingerprints.index)
+        stale = changed.union(removed)
+
+        enriched = pd.read_parquet(enriched_path)
+        kept = enriched[~enriched[ENRICHED_KEY].isin(stale)]
+        delta_psp = psp_df[psp_df["order_number"].astype(str).isin(changed)]
+        if delta_psp.empty:
+            df = kept.reset_index(drop=True)
+        else:
+            delta_orders = order_details_df[order_details_df["Order Number"].astype(str).isin(changed)]
+            delta = enrich(delta_orders, delta_psp, keep_key=True)
+            df = _sorted(pd.concat([kept, delta], ignore_index=True))
+        stats = {"mode": "incremental", "orders": len(fingerprints), "rebuilt": len(changed), "removed": len(removed)}
+
+    if stats["rebuilt"] or stats["removed"]:
+        columnar_store.write_frame(df, enriched_path)
+        columnar_store.write_frame(fingerprints.to_frame(), fp_path, index=True)
+    return df, stats
+
+
+def compact(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast an enriched frame to the compact in-memory layout."""
+    types = {c: "category" for c in ENRICHED_CATEGORIES if c in df.columns}
+    types.update({c: "float32" for c in ENRICHED_AMOUNTS if c in df.columns})
+    if "Order Number" in df.columns:
+        types["Order Number"] = "string[pyarrow]"
+    return df.astype(types)
+
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    """Bytes per row for each column and in total, counting string payloads."""
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({"dtype": df.dtypes.astype(str), "bytes_per_row": usage / max(len(df), 1)})
+    report.loc["total"] = ["", report["bytes_per_row"].sum()]
+    return report
+
+
+def get_enriched_orders(full: bool = False) -> pd.DataFrame:
+    """The compact enriched dataset via the incremental build, without its internal key column."""
+    df, _ = build_enriched_orders(full)
+    return compact(df.drop(columns=[ENRICHED_KEY]))
+
+
+def export_order_details_with_psp(df: pd.DataFrame | None = None, path: Path = ENRICHED_CSV) -> Path:
+    """Write the enriched dataset to CSV (previously done by the dashboard on every rerun)."""
+    df = get_order_details() if df is None else df
+    df.to_csv(path, index=False)
+    return path
+
+
 if __name__ == "__main__":
     df = get_order_details()
+    export_order_details_with_psp(df)
+    before, after = memory_report(df), memory_report(compact(df))
+    print(pd.concat({"before": before, "after": after}, axis=1).round(1).to_string())
     df["value_check"] = df["Total Purchased"] - df["gross_amount"]
     cols = ["Order Number", "Total Purchased", "gross_amount","currency_code","value_check",'payment_method']
     cols = [c for c in cols if c in df.columns]
     mismatched = df.loc[df["value_check"] > 0.1, cols]
-    mismatched.to_csv("app/data/mismatched_orders.csv", index=False, columns=cols)
\ No newline at end of file
+    mismatched.to_csv(data_path("mismatched_orders.csv"), index=False, columns=cols)
\ No newline at end of file